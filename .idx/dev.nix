@@ -10,7 +10,8 @@
       ps.streamlit
       ps.yfinance
       ps.pandas
-      ps.pandas-ta
+      ps.numpy
+      ps.pyarrow
       ps.requests
     ]))
   ];
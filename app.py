@@ -1,10 +1,16 @@
 import streamlit as st
-import yfinance as yf
 import pandas as pd
-import pandas_ta as ta
-import requests
-import numpy as np
-from datetime import datetime, timedelta
+from datetime import datetime
+from store import BarStore
+from krx import KrxCodeTable
+from names import SymbolDirectory
+from cache import LRUCache
+from levels import LevelIndex
+from rules import compile_rules, V14_3_MTF
+from watch import Watcher
+from metrics import BYTES_NOTE, Trace, tracing
+from watchlist import WatchlistStore, JsonBinRemote, DEFAULT_LIST
+from scan import scan_states, finalize_results, normalize_tickers, rank_results, style_results, COLUMNS, LEVEL_COLUMN
 
 # --- 페이지 설정 ---
 st.set_page_config(page_title="Quant Screener v14.3", layout="wide")
@@ -32,48 +38,27 @@ with st.expander("📘 v14.3 가이드: 실시간 하이브리드 분석"):
     ''')
 
 # --- 1. 유틸리티 함수 ---
-@st.cache_data(ttl=86400)
-def get_stock_name(ticker):
-    # 한국 주식
-    if ".KS" in ticker or ".KQ" in ticker:
-        try:
-            code = ticker.split('.')[0]
-            url = f"https://m.stock.naver.com/api/stock/{code}/integration"
-            headers = {'User-Agent': 'Mozilla/5.0'}
-            res = requests.get(url, headers=headers, timeout=2)
-            if res.status_code == 200: return res.json().get('stockName', ticker)
-        except: return ticker
-    # 미국 주식
-    try:
-        stock = yf.Ticker(ticker)
-        return stock.info.get('shortName') or stock.info.get('longName') or ticker
-    except: return ticker
+@st.cache_resource
+def get_krx_table():
+    return KrxCodeTable()
+
+@st.cache_resource
+def get_symbol_directory():
+    return SymbolDirectory()
 
-def get_pivot_points(df):
-    if len(df) < 2: return 0,0,0,0,0
-    last = df.iloc[-2]
-    h, l, c = last['high'], last['low'], last['close']
-    p = (h + l + c) / 3
-    r1 = (2 * p) - l
-    s1 = (2 * p) - h
-    r2 = p + (h - l)
-    s2 = p - (h - l)
-    return p, s1, s2, r1, r2
+@st.cache_resource
+def get_bar_store():
+    return BarStore()
 
-def get_fibonacci_levels(df, period=120):
-    if len(df) < period: period = len(df)
-    recent = df.tail(period)
-    max_h = recent['high'].max()
-    min_l = recent['low'].min()
-    diff = max_h - min_l
-    fib_618 = max_h - (diff * 0.618)
-    fib_050 = max_h - (diff * 0.5)
-    return fib_618, fib_050, max_h, min_l
+@st.cache_resource
+def get_state_cache():
+    # 세션 간 공유되는 분석 상태 캐시 (티커, 마지막 봉, 체결가) → 지표/신호
+    return LRUCache()
 
-def get_max_vol_price(df, period=240):
-    if len(df) < period: period = len(df)
-    recent = df.tail(period)
-    return recent.loc[recent['volume'].idxmax()]['close']
+@st.cache_resource
+def get_level_index():
+    # 세션 간 공유되는 다중 시간대 레벨 인덱스 - 새 봉이 붙은 티커만 다시 계산한다
+    return LevelIndex()
 
 # --- 2. 데이터 저장소 ---
 api_key_names = ["JSONBIN_API_KEY", "jsonbin_api_key"]
@@ -81,38 +66,23 @@ bin_id_names = ["JSONBIN_BIN_ID", "jsonbin_bin_id"]
 JSONBIN_API_KEY = next((st.secrets.get(key) for key in api_key_names), None)
 JSONBIN_BIN_ID = next((st.secrets.get(key) for key in bin_id_names), None)
 
-if JSONBIN_API_KEY and JSONBIN_BIN_ID:
-    JSONBIN_URL = f"https://api.jsonbin.io/v3/b/{JSONBIN_BIN_ID}"
-    HEADERS = {'Content-Type': 'application/json', 'X-Master-Key': JSONBIN_API_KEY}
-else: JSONBIN_URL = None
-
-@st.cache_data(ttl=300)
-def load_watchlist():
-    if not JSONBIN_URL: return []
-    try:
-        res = requests.get(f"{JSONBIN_URL}/latest", headers=HEADERS)
-        return res.json().get('record', {}).get('watchlist', [])
-    except: return []
-
-def save_watchlist(data):
-    if not JSONBIN_URL: return False
-    try:
-        requests.put(JSONBIN_URL, headers=HEADERS, json={'watchlist': data})
-        st.cache_data.clear()
-        return True
-    except: return False
+@st.cache_resource
+def get_watchlist_store():
+    # 관심종목: 로컬 파일이 원본이고 JSONBin 에는 편집을 모아 백그라운드로 올린다 (다른 캐시는 건드리지 않는다)
+    remote = JsonBinRemote(JSONBIN_BIN_ID, JSONBIN_API_KEY) if JSONBIN_API_KEY and JSONBIN_BIN_ID else None
+    return WatchlistStore(remote=remote)
 
-if 'watchlist_loaded' not in st.session_state:
-    st.session_state.watchlist = load_watchlist()
-    st.session_state.watchlist_loaded = True
+watchlists = get_watchlist_store()
 
 # --- 3. 사이드바 UI ---
 market_choice = st.sidebar.radio("시장 선택", ('미국 증시 (US)', '한국 증시 (Korea)'), horizontal=True)
-watchlist_str = ", ".join(st.session_state.watchlist)
+# 관심종목 목록마다 프리셋 하나 ("❤️ 내 관심종목" 은 기본 목록)
+watchlist_presets = {("❤️ 내 관심종목" if name == DEFAULT_LIST else f"❤️ {name}"): ", ".join(watchlists.get(name))
+                     for name in watchlists.names()}
 
 if market_choice == '한국 증시 (Korea)':
     raw_presets = {
-        "❤️ 내 관심종목": watchlist_str,
+        **watchlist_presets,
         "💾 반도체/HBM (50종)": "005930.KS, 000660.KS, 042700.KS, 000020.KS, 028300.KQ, 058470.KQ, 403870.KQ, 095340.KQ, 005290.KS, 088800.KQ, 036540.KQ, 036930.KQ, 000990.KS, 079370.KQ, 030530.KQ, 253450.KQ, 046120.KQ, 054450.KQ, 023460.KQ, 373200.KQ, 281740.KQ, 263360.KQ, 006730.KQ, 039230.KQ, 084370.KQ, 015920.KQ, 140410.KQ, 104830.KQ, 056620.KQ, 092220.KQ, 085370.KQ, 049430.KQ, 077360.KQ, 121890.KQ, 160550.KQ, 043650.KQ, 091700.KQ, 058820.KQ, 135150.KQ, 074950.KQ, 322310.KQ, 402340.KQ, 222800.KQ, 330590.KQ, 131290.KQ, 067310.KQ, 131970.KQ, 089980.KQ, 064290.KQ, 005810.KS",
         "🔋 2차전지/리튬 (45종)": "373220.KS, 006400.KS, 051910.KS, 003670.KS, 247540.KQ, 086520.KQ, 066970.KQ, 005070.KS, 277810.KQ, 000270.KS, 096770.KS, 011790.KS, 025980.KQ, 099190.KQ, 101160.KQ, 307930.KQ, 365550.KQ, 382900.KQ, 450080.KQ, 157970.KS, 217270.KQ, 091990.KQ, 009830.KS, 009540.KS, 005950.KS, 117580.KS, 210980.KS, 034730.KS, 003620.KS, 004100.KS, 345740.KQ, 158310.KQ, 333620.KQ, 354310.KQ, 417010.KQ, 294630.KQ, 348370.KQ, 007460.KQ, 298050.KQ, 054620.KQ, 013700.KS, 020150.KQ, 024880.KS, 002960.KS, 138930.KS",
         "🤖 로봇/AI/SW (40종)": "035420.KS, 035720.KS, 251270.KS, 036570.KQ, 005940.KS, 293490.KQ, 006360.KS, 352820.KS, 454910.KS, 277810.KQ, 446360.KQ, 302430.KQ, 052420.KQ, 097870.KQ, 348210.KQ, 405350.KQ, 425420.KQ, 086960.KQ, 253840.KQ, 371460.KQ, 067000.KQ, 189980.KQ, 285130.KQ, 012510.KQ, 290550.KQ, 263750.KQ, 419530.KQ, 307950.KQ, 192080.KQ, 365270.KQ, 060250.KQ, 053800.KQ, 018260.KS, 396690.KQ, 443060.KQ, 457190.KQ, 212560.KQ, 032190.KQ, 230360.KQ, 108860.KQ",
@@ -124,7 +94,7 @@ if market_choice == '한국 증시 (Korea)':
     caption = "💡 종목 코드 입력 (예: 005930, 247540.KQ)"
 else: # 미국
     raw_presets = {
-        "❤️ 내 관심종목": watchlist_str,
+        **watchlist_presets,
         "👑 M7 & AI 하드웨어 (40종)": "NVDA, AAPL, MSFT, GOOGL, AMZN, META, TSLA, NFLX, AVGO, AMD, ORCL, CRM, ADBE, INTC, QCOM, CSCO, TXN, IBM, UBER, ABNB, TSM, MU, ARM, SMCI, DELL, VRT, PSTG, AMAT, LRCX, KLAC, TER, ASML, MRVL, ON, ANET, JBL, CLS, GFS, STM, NXPI",
         "☁️ SaaS/보안/클라우드 (40종)": "PLTR, SNOW, CRWD, PANW, FTNT, ZS, MDB, DDOG, NET, PATH, HUBS, TEAM, WDAY, NOW, ADSK, ANSS, SNPS, CDNS, SHOP, SQ, U, RBLX, TTD, APP, DUOL, GTLB, CFLT, IOT, HCP, OKTA, DOCU, ZM, ESTC, FSLY, Sentinel, CYBR, TENB, VRNS, QLYS, GEN",
         "💊 비만/신약/헬스케어 (40종)": "LLY, NVO, VRTX, REGN, AMGN, PFE, MRK, JNJ, UNH, ABBV, BMY, GILD, BIIB, MRNA, BNTX, ISRG, SYK, EW, MDT, ZTS, HCA, CVS, CI, ELV, MCK, COR, DXCM, RGEN, TMO, DHR, ILMN, A, WAT, MTD, STE, BAX, BDX, BSX, CNC, HUM",
@@ -143,6 +113,11 @@ preset_key = st.sidebar.selectbox("종목 프리셋", presets.keys())
 tickers_input = st.sidebar.text_area("분석할 티커", presets[preset_key], height=150)
 st.sidebar.caption(caption)
 run_analysis_button = st.sidebar.button("🚀 AI 퀀트 분석 시작!", type="primary")
+watch_mode = st.sidebar.toggle("👀 실시간 감시 (자동 갱신)", help="일봉은 한 번만 받고, 주기마다 체결가가 바뀐 종목만 다시 분석합니다.")
+watch_interval = st.sidebar.number_input("갱신 주기 (초)", 15, 600, 60, 15) if watch_mode else 0
+use_levels = st.sidebar.toggle("📐 다중 시간대 레벨 (v14.3-mtf)", disabled=watch_mode,
+                               help="일/주/월봉 피벗·피보나치와 거래량 프로파일 레벨을 더한 규칙으로 점수를 내고, 현재가 ±2% 안 레벨 수 열을 붙입니다 (실시간 감시에서는 꺼짐).")
+measure_memory = st.sidebar.toggle("📏 단계별 최대 메모리 측정", help="tracemalloc 으로 단계마다 파이썬 할당 최대치를 잽니다 (분석이 느려집니다).")
 
 st.sidebar.divider()
 st.sidebar.subheader("🛡️ 리스크 관리 (손절)")
@@ -154,260 +129,120 @@ if stop_loss_mode == "ATR 기반 (권장)":
 elif stop_loss_mode == "고정 비율 (%)":
     stop_loss_pct = st.sidebar.slider("손절 비율 (%)", 1.0, 10.0, 3.0, 0.5)
 
-# --- 4. 분석 로직 (v14.3 Risk Warning & 24/7 Hybrid) ---
-def analyze_dataframe(ticker, df, rt_date_str, stop_loss_mode, market, **kwargs):
-    try:
-        # 지표 계산
-        df.ta.sma(length=20, append=True)
-        df.ta.sma(length=60, append=True)
-        df.ta.sma(length=120, append=True)
-        df.ta.sma(length=200, append=True)
-        df.ta.rsi(length=14, append=True)
-        df.ta.bbands(length=20, std=2, append=True)
-        df.ta.atr(length=14, append=True)
-        
-        df = df.dropna()
-        if len(df) < 5: return {"티커": ticker, "신호": "데이터 부족"}
-
-        cols = df.columns
-        bbl_col = next((c for c in cols if 'BBL' in str(c)), None)
-        bbu_col = next((c for c in cols if 'BBU' in str(c)), None)
-        sma200_col = next((c for c in cols if 'SMA_200' in str(c)), None)
-        sma60_col = next((c for c in cols if 'SMA_60' in str(c)), None)
-        sma120_col = next((c for c in cols if 'SMA_120' in str(c)), None)
-        atr_col = next((c for c in cols if 'ATRr' in str(c)), None)
-        
-        if not all([bbl_col, bbu_col, sma200_col, sma60_col, atr_col]):
-             return {"티커": ticker, "신호": "지표 실패"}
-
-        latest = df.iloc[-1]
-        close = latest['close']
-        rsi = latest['RSI_14']
-        currency = "₩" if market == '한국 증시 (Korea)' else "$"
-        
-        p, s1, s2, r1, r2 = get_pivot_points(df)
-        fib_618, fib_500, swing_high, swing_low = get_fibonacci_levels(df)
-        max_vol_price = get_max_vol_price(df)
-
-        # [매수 판정]
-        buy_score = 0
-        buy_reasons = []
-        trend = "상승" if close > latest[sma200_col] else "하락"
-        if close > p: buy_score += 0.5
-
-        supports = {
-            "볼린저하단": latest[bbl_col], "피벗S1": s1, "피보나치(0.618)": fib_618,
-            "60일선": latest[sma60_col], "120일선": latest[sma120_col], "최대매물대": max_vol_price
-        }
-        hit_supports = []
-        for name, price in supports.items():
-            if price > 0 and close <= price * 1.025 and close >= price * 0.975:
-                hit_supports.append(name)
-        
-        if hit_supports:
-            buy_score += len(hit_supports) * 1.5
-            buy_reasons.extend(hit_supports)
-        
-        if rsi < 35: buy_score += 2; buy_reasons.append(f"RSI과매도({rsi:.1f})")
-        elif rsi < 50 and trend == "상승": buy_score += 1
-
-        # [매도 판정]
-        sell_score = 0
-        sell_reasons = []
-        resistances = {"볼린저상단": latest[bbu_col], "피벗R1": r1, "피벗R2": r2, "전고점": swing_high}
-        hit_resistances = []
-        for name, price in resistances.items():
-            if price > 0 and close >= price * 0.98:
-                hit_resistances.append(name)
-        
-        if hit_resistances:
-            sell_score += len(hit_resistances) * 1.5
-            sell_reasons.extend(hit_resistances)
-            
-        if rsi > 70: sell_score += 2; sell_reasons.append(f"RSI과매수({rsi:.1f})")
-        elif rsi > 65: sell_score += 1
-
-        # [최종 신호]
-        signal = "관망"
-        color = "black"
-
-        if rsi < 60:
-            if buy_score >= 5 or (trend == "상승" and len(hit_supports) >= 3):
-                signal = "💎 인생 매수"
-                color = "purple"
-            elif buy_score >= 3.5 or (trend == "상승" and len(hit_supports) >= 2):
-                signal = "🔥 강력 매수"
-                color = "red"
-            elif trend == "상승" and rsi < 55 and (buy_score >= 2 or len(hit_supports) >= 1):
-                signal = "✅ 매수 고려"
-                color = "orange"
-        
-        if signal == "관망":
-            if sell_score >= 3 or (len(hit_resistances) >= 1 and rsi > 70):
-                signal = "🚨 이익 실현"
-                color = "blue"
-            elif sell_score >= 1.5:
-                signal = "📉 분할 매도"
-                color = "skyblue"
-            elif trend == "하락" and buy_score >= 3:
-                signal = "⚠️ 기술적 반등"
-                color = "gray"
-
-        if signal != "관망":
-            reasons = buy_reasons if "매수" in signal or "반등" in signal else sell_reasons
-            if reasons: signal += f" ({', '.join(reasons)})"
-
-        # 손절가
-        loss_info = "N/A"
-        if stop_loss_mode == "ATR 기반 (권장)":
-            val = close - (latest[atr_col] * kwargs.get('atr_multiplier', 2.0))
-            loss_info = f"{currency}{val:,.0f} (-{round((close-val)/close*100,1)}%)"
-        elif stop_loss_mode == "피봇 지지선 (S1) 기준":
-            loss_info = f"{currency}{s1:,.0f}" if s1>0 else "불가"
-        else:
-            pct = kwargs.get('stop_loss_pct', 3.0)
-            val = close * (1 - pct/100)
-            loss_info = f"{currency}{val:,.0f} (-{pct}%)"
-
-        return {
-            "티커": ticker, "신호": signal, "현재가": close, "체결시간": rt_date_str,
-            "손절가": loss_info, "목표가": r1, "피보나치(0.618)": fib_618, "RSI": rsi, "추세": trend, "color": color
-        }
-    except Exception as e: return {"티커": ticker, "신호": "오류", "오류 원인": str(e)}
-
-# --- 5. 실행 루프 ---
+# --- 4. 실행 루프 ---
 if run_analysis_button:
-    tickers_raw = [t.strip().upper() for t in tickers_input.split(',') if t.strip()]
-    tickers = []
-    
-    # 스마트 티커 처리
-    for t in tickers_raw:
-        if market_choice == '한국 증시 (Korea)':
-            if t.endswith('.KS') or t.endswith('.KQ'): tickers.append(t)
-            elif t.isdigit(): tickers.append(f"{t}.KS")
-            else: tickers.append(t)
-        else: tickers.append(t)
+    krx = get_krx_table() if market_choice == '한국 증시 (Korea)' else None
+    tickers = normalize_tickers(tickers_input, market_choice, krx=krx)
 
     if not tickers: st.warning("분석할 종목을 입력해주세요.")
     else:
-        results, errors = [], []
         status_text = st.empty()
         status_text.text("데이터 다운로드 중... (Batch)")
         
         try:
-            # 1. 일봉 (Daily Batch)
-            batch_data = yf.download(tickers, period="1y", group_by='ticker', progress=False)
-            
             bar = st.progress(0, "분석 시작...")
-            
-            for i, ticker in enumerate(tickers):
-                status_text.text(f"[{ticker}] 정밀 분석 중... ({i+1}/{len(tickers)})")
-                bar.progress((i+1)/len(tickers))
-                
-                try:
-                    # Data A: Daily Extraction
-                    if len(tickers) == 1: df = batch_data.copy()
-                    else:
-                        try: df = batch_data[ticker].copy()
-                        except KeyError:
-                            if ".KS" in ticker:
-                                alt = ticker.replace(".KS", ".KQ")
-                                df = yf.download(alt, period="1y", progress=False)
-                                if not df.empty: ticker = alt
-                            else: df = pd.DataFrame()
-
-                    if df.empty:
-                        errors.append({"티커": ticker, "신호": "데이터 없음"})
-                        continue
-                    
-                    # MultiIndex Flatten
-                    if isinstance(df.columns, pd.MultiIndex):
-                        df.columns = df.columns.get_level_values(-1)
-                    df.columns = df.columns.str.lower()
-                    
-                    rt_date_str = "정규장 종가"
-
-                    # Data B: Real-time (Individual Fetch)
-                    try:
-                        ticker_obj = yf.Ticker(ticker)
-                        # 최근 5일치 1분봉 (장외 포함) 개별 요청
-                        df_rt = ticker_obj.history(period="5d", interval="1m", prepost=True)
-                        
-                        if not df_rt.empty:
-                            last_tick = df_rt.iloc[-1]
-                            rt_price = last_tick['Close']
-                            rt_time = last_tick.name 
-                            rt_date_str = rt_time.strftime("%m-%d %H:%M")
-                            
-                            last_date_daily = df.index[-1].date()
-                            rt_date_only = rt_time.date()
-                            
-                            # Tick Injection
-                            if rt_date_only > last_date_daily:
-                                new_row = pd.DataFrame(
-                                    {'open': rt_price, 'high': rt_price, 'low': rt_price, 'close': rt_price, 'volume': 0},
-                                    index=[pd.Timestamp(rt_date_only)]
-                                )
-                                df = pd.concat([df, new_row])
-                                rt_date_str += " (장전/시작)"
-                            else:
-                                df.iloc[-1, df.columns.get_loc('close')] = rt_price
-                                rt_date_str += " (실시간)"
-                                
-                    except Exception as e: pass
-
-                    # 분석 실행
-                    res = analyze_dataframe(ticker, df, rt_date_str, stop_loss_mode, market_choice, atr_multiplier=atr_multiplier, stop_loss_pct=stop_loss_pct)
-                    res["종목명"] = get_stock_name(ticker)
-                    
-                    if "오류" in res.get("신호", ""): errors.append(res)
-                    else: results.append(res)
-                    
-                except Exception as e:
-                    errors.append({"티커": ticker, "신호": "분석 실패", "원인": str(e)})
+            def on_progress(stage, done, total, ticker):
+                if stage == 'realtime':
+                    status_text.text(f"[{ticker}] 실시간 체결가 수집 중... ({done}/{total})")
+                    bar.progress(done/total)
+                elif stage == 'analyze': status_text.text("정밀 분석 중... (Vectorized)")
+                elif stage == 'names': status_text.text(f"종목명 조회 중... ({total}건)")
+
+            # 실행 계측: 단계별 시간/요청/바이트/캐시 적중을 모아 결과 아래에 보여준다 (감시 중 폴링도 같은 Trace 에 쌓인다)
+            with tracing(Trace(memory=measure_memory)) as trace:
+                if watch_mode:
+                    # 감시 모드: 일봉 패널을 스트리밍 상태로 들고 있다가 주기마다 바뀐 체결가만 반영
+                    watcher = Watcher(tickers, market_choice, store=get_bar_store(), names=get_symbol_directory(), krx=krx, progress=on_progress)
+                    st.session_state.watcher, st.session_state.transitions = watcher, {}
+                    states, rt_labels, errors = watcher.snapshot()
+                else:
+                    st.session_state.pop('watcher', None)
+                    states, rt_labels, errors = scan_states(
+                        tickers, market_choice, store=get_bar_store(), names=get_symbol_directory(),
+                        krx=krx, progress=on_progress, cache=get_state_cache(),
+                        rules=compile_rules(V14_3_MTF) if use_levels else None, levels=get_level_index() if use_levels else None
+                    )
+            st.session_state.last_trace = trace
+            st.session_state.last_scan = {'states': states, 'rt_labels': rt_labels, 'errors': errors, 'market': market_choice}
 
             bar.empty()
             status_text.empty()
 
-            if results:
-                st.success(f"✅ 분석 완료! ({len(results)}건)")
-                res_df = pd.DataFrame(results)
-                sig_map = {'💎':0, '🔥':1, '✅':2, '⚠️':3, '🚨':4, '📉':5, '관':6}
-                res_df['sort'] = res_df['신호'].apply(lambda x: sig_map.get(x[0], 9))
-                res_df = res_df.sort_values('sort')
-
-                cur = "₩{:,.0f}" if market_choice == '한국 증시 (Korea)' else "${:,.2f}"
-                fmt = {"현재가": cur, "목표가": cur, "피보나치(0.618)": cur, "RSI": "{:.1f}"}
-                
-                def color_sig(val):
-                    if '💎' in val: return 'color: purple; font-weight: bold; background-color: #f0f0f5'
-                    if '🔥' in val: return 'color: red; font-weight: bold'
-                    if '✅' in val: return 'color: orange; font-weight: bold'
-                    if '🚨' in val: return 'color: blue; font-weight: bold'
-                    if '📉' in val: return 'color: skyblue; font-weight: bold'
-                    if '⚠️' in val: return 'color: gray'
-                    return ''
-
-                cols = ["티커", "종목명", "신호", "현재가", "체결시간", "손절가", "목표가", "피보나치(0.618)", "RSI", "추세"]
-                st.dataframe(res_df[cols].style.format(fmt).map(color_sig, subset=['신호']), use_container_width=True, hide_index=True)
-
-            if errors: st.warning("⚠️ 실패 목록"); st.dataframe(pd.DataFrame(errors))
-
         except Exception as e:
             st.error(f"다운로드 중 오류 발생: {e}")
 
-# --- 6. 관심종목 관리 ---
+# 마지막 스캔 결과 표시: 손절 방식/슬라이더가 바뀌면 저장된 분석 상태에서 결과 행만 다시 만든다 (재다운로드 없음)
+def render_results(last, transitions=None):
+    trace = st.session_state.get('last_trace')
+    with tracing(trace):
+        results, failed = finalize_results(
+            last['states'], last['rt_labels'], last['market'], stop_loss_mode, names=get_symbol_directory(),
+            atr_multiplier=atr_multiplier, stop_loss_pct=stop_loss_pct
+        )
+    errors = last['errors'] + failed
+
+    if results:
+        st.success(f"✅ 분석 완료! ({len(results)}건)")
+        res_df = rank_results(results)
+        columns = list(COLUMNS) + ([LEVEL_COLUMN] if LEVEL_COLUMN in res_df.columns else [])
+        if transitions is not None:
+            # 감시 중 신호가 바뀐 종목: "이전 → 현재"
+            res_df["변화"] = res_df["티커"].map(lambda t: " → ".join(transitions[t]) if t in transitions else "")
+            columns.insert(columns.index("신호") + 1, "변화")
+
+        st.dataframe(style_results(res_df, last['market'], columns), use_container_width=True, hide_index=True)
+
+    if errors: st.warning("⚠️ 실패 목록"); st.dataframe(pd.DataFrame(errors))
+
+    if trace is not None:
+        with st.expander("⏱️ 실행 계측"):
+            st.dataframe(trace.summary(), use_container_width=True)
+            memory = ("peak_mb: 단계 안의 파이썬 할당 최대치 (tracemalloc)" if trace.memory else
+                      "rss_mb / rss_delta_mb: 단계 끝의 프로세스 RSS 와 단계 동안의 변화 (최대치는 사이드바 '단계별 최대 메모리 측정')")
+            st.caption(f"{BYTES_NOTE} {memory}")
+            c1, c2 = st.columns(2)
+            c1.download_button("JSON 내보내기", trace.to_json(), f"trace_{trace.run_id}.json", "application/json", key=f"trace_json_{trace.run_id}")
+            c2.download_button("CSV 내보내기", trace.to_csv(), f"trace_{trace.run_id}.csv", "text/csv", key=f"trace_csv_{trace.run_id}")
+
+if 'last_scan' in st.session_state:
+    if watch_mode and 'watcher' in st.session_state:
+        @st.fragment(run_every=watch_interval)
+        def live_results():
+            # 이 블록만 주기적으로 다시 그린다. 주기가 안 됐으면 (슬라이더 조작 등) 폴링 없이 표만 다시 만든다
+            watcher = st.session_state.watcher
+            if watcher.due(watch_interval):
+                with tracing(st.session_state.get('last_trace')): changed, transitions = watcher.poll()
+                for ticker, old, new in transitions:
+                    st.session_state.transitions[ticker] = (old, new)
+                    st.toast(f"{ticker}: {old} → {new}")
+                states, rt_labels, errors = watcher.snapshot()
+                st.session_state.last_scan = {'states': states, 'rt_labels': rt_labels, 'errors': errors, 'market': watcher.market}
+            st.caption(f"👀 실시간 감시 중 · {watch_interval}초 주기 · 갱신 {watcher.polls}회 · "
+                       f"마지막 갱신 {datetime.fromtimestamp(watcher.polled):%H:%M:%S}")
+            render_results(st.session_state.last_scan, st.session_state.transitions)
+        live_results()
+    else:
+        render_results(st.session_state.last_scan)
+
+# --- 5. 관심종목 관리 ---
 st.sidebar.divider()
 st.sidebar.subheader("❤️ 관심종목 관리")
 with st.sidebar.expander("목록 편집"):
-    new_t = st.text_input("추가", placeholder="예: 005930").upper()
+    list_name = st.selectbox("목록", watchlists.names())
+    new_t = st.text_input("추가", placeholder="예: 005930, NVDA (여러 개는 쉼표로)").upper()
     if st.button("➕ 저장"):
-        if new_t and new_t not in st.session_state.watchlist:
-            new_l = st.session_state.watchlist + [new_t]
-            if save_watchlist(new_l): st.session_state.watchlist = new_l; st.rerun()
-    for t in st.session_state.watchlist:
+        if watchlists.add(list_name, [t.strip() for t in new_t.split(',') if t.strip()]): st.rerun()
+    for t in watchlists.get(list_name):
         c1, c2 = st.columns([0.8, 0.2])
         c1.text(f"- {t}")
-        if c2.button("X", key=f"d_{t}"):
-            new_l = [x for x in st.session_state.watchlist if x != t]
-            if save_watchlist(new_l): st.session_state.watchlist = new_l; st.rerun()
+        if c2.button("X", key=f"d_{list_name}_{t}"):
+            if watchlists.remove(list_name, t): st.rerun()
+
+    st.divider()
+    new_list = st.text_input("새 목록 이름").strip()
+    c1, c2 = st.columns(2)
+    if c1.button("📁 목록 추가") and watchlists.create(new_list): st.rerun()
+    if list_name != DEFAULT_LIST and c2.button("🗑️ 목록 삭제") and watchlists.delete(list_name): st.rerun()
+    if watchlists.remote is None: st.caption("💾 로컬에만 저장 (JSONBin 미설정)")
+    elif watchlists.dirty: st.caption("⏳ 원격 동기화 대기 중" + (" (마지막 시도 실패)" if watchlists.last_error else ""))
+    else: st.caption("☁️ 원격과 동기화됨")
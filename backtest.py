@@ -0,0 +1,278 @@
+# 벡터화 백테스트 (v14.3 또는 rules.py 규칙 세트)
+# 라이브 스캔과 같은 지표/점수 함수를 모든 과거 봉에 한 번에 적용하고 (봉 루프 없음), 매수 신호 봉 종가에 진입해
+# 손절(ATR k / 피벗 S1 / 고정 %) · 목표가(피벗 R1) · 보유 기간 만료 중 먼저 닿는 쪽으로 청산한다.
+# 티커 청크는 프로세스 풀로, 손절 파라미터 그리드는 청크 안에서 한 번에 (배열 축 하나로) 돌린다.
+# 규칙 세트가 여러 개면 봉 특징은 한 번만 만들고 세트마다 신호만 다시 내며, 결과에 rules 열이 붙는다.
+#   python backtest.py --market us --file sp500.txt --period 10y --atr-k 1.5 2 2.5 3 --workers 8
+import argparse
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+from engine import KOREA, FIB_PERIOD, MAX_VOL_PERIOD, compute_indicators, score_features, rolling_max, rolling_min
+from krx import KrxCodeTable
+from scan import MARKETS, STOP_LOSS_MODES, load_panel, normalize_tickers, read_ticker_file, write_table
+from rules import DEFAULT, compile_rules, load_rules
+from store import BarStore
+
+HORIZON = 20     # 최대 보유 봉 수
+VOL_BLOCK = 64   # 최대매물대 창 계산 시 한 번에 펼치는 봉 수 (메모리 상한)
+OUTCOMES = ('target', 'stop', 'time')
+
+# --- 1. 모든 봉의 특징 (각 봉 시점까지의 데이터만 사용) ---
+def _rolling_argmax_price(volume, close, n):
+    # 봉마다 직전 n 개 유효 봉 중 거래량 최대 봉의 종가 (동률이면 앞선 봉 - latest_features 의 argmax 와 같다)
+    N, T = volume.shape
+    padded = np.concatenate([np.full((N, n - 1), -np.inf), volume], axis=1)
+    out = np.empty((N, T))
+    rows = np.arange(N)[:, None]
+    for s in range(0, T, VOL_BLOCK):
+        e = min(s + VOL_BLOCK, T)
+        top = np.argmax(sliding_window_view(padded[:, s:e + n - 1], n, axis=1), axis=2)
+        out[:, s:e] = close[rows, np.clip(np.arange(s, e)[None, :] - (n - 1) + top, 0, T - 1)]
+    return out
+
+def bar_features(panel, ind=None):
+    # latest_features 를 모든 봉에 대해 (N, T) 로. eligible = 그 봉에서 라이브 스캔이 신호를 냈을 봉
+    v = panel['values']
+    high, low, close, volume = v[:, :, 1], v[:, :, 2], v[:, :, 3], v[:, :, 4]
+    with np.errstate(invalid='ignore'):
+        ind = ind or compute_indicators(panel)
+    valid = ind['valid']
+    N, T = valid.shape
+    rank = np.cumsum(valid, axis=1)
+    has_all = ind['has']['sma200'] & ind['has']['sma60'] & ind['has']['atr'] & ind['has']['bbl']
+    f = {'eligible': valid & (rank >= 5) & has_all[:, None], 'close': close}
+    for name in ('rsi', 'sma60', 'sma120', 'sma200', 'bbl', 'bbu', 'atr'):
+        f[name] = ind[name]
+
+    # 피벗: 직전 유효 봉
+    last = np.maximum.accumulate(np.where(valid, np.arange(T), -1), axis=1)
+    prev = np.concatenate([np.full((N, 1), -1), last[:, :-1]], axis=1)
+    rows = np.arange(N)[:, None]
+    pick = lambda a: np.where(prev >= 0, a[rows, np.clip(prev, 0, None)], np.nan)
+    h, l, c = pick(high), pick(low), pick(close)
+    p = (h + l + c) / 3
+    f['p'], f['s1'], f['r1'] = p, (2 * p) - h, (2 * p) - l
+    f['s2'], f['r2'] = p - (h - l), p + (h - l)
+
+    # 피보나치 / 최대매물대: 유효 봉만 남긴 창 (유효 봉은 연속이므로 봉 창 = 유효 봉 창)
+    max_h = rolling_max(np.where(valid, high, np.nan), FIB_PERIOD)
+    min_l = rolling_min(np.where(valid, low, np.nan), FIB_PERIOD)
+    f['fib_618'], f['fib_500'] = max_h - ((max_h - min_l) * 0.618), max_h - ((max_h - min_l) * 0.5)
+    f['swing_high'], f['swing_low'] = max_h, min_l
+    f['max_vol_price'] = _rolling_argmax_price(np.where(valid, volume, -np.inf), close, MAX_VOL_PERIOD)
+    return f
+
+def bar_signals(f, rules=None):
+    # → 신호 코드 (N, T), 신호를 낼 수 없는 봉은 -1
+    eligible = f['eligible']
+    flat = {k: a[eligible] for k, a in f.items() if k != 'eligible'}
+    with np.errstate(invalid='ignore'):
+        code = score_features(flat, rules)['code']
+    codes = np.full(eligible.shape, -1)
+    codes[eligible] = code
+    return codes
+
+# --- 2. 진입/청산 시뮬레이션 ---
+def stop_levels(entry, atr, s1, grid):
+    # (M,) → (M, G). 진입가 이상이거나 계산 불가한 손절선은 NaN (손절 없이 목표가/기간 청산)
+    cols = []
+    for params in grid:
+        mode = params['stop_loss_mode']
+        if mode == STOP_LOSS_MODES['atr']: stop = entry - atr * params.get('atr_multiplier', 2.0)
+        elif mode == STOP_LOSS_MODES['pivot']: stop = s1.copy()
+        else: stop = entry * (1 - params.get('stop_loss_pct', 3.0) / 100)
+        cols.append(np.where((stop > 0) & (stop < entry), stop, np.nan))
+    return np.stack(cols, axis=1)
+
+def _first(hit):
+    # 첫 True 위치, 없으면 horizon
+    return np.where(hit.any(axis=1), np.argmax(hit, axis=1), hit.shape[1])
+
+def simulate(panel, codes, f, grid, horizon=HORIZON, rules=None):
+    # 매수 신호 봉 종가 진입. 같은 봉에서 손절·목표가가 모두 닿으면 손절로 본다 (보수적)
+    v = panel['values']
+    N, T = codes.shape
+    ii, tt = np.nonzero(np.isin(codes, (rules or DEFAULT).buy_codes))
+    keep = tt < T - 1  # 마지막 봉 신호는 아직 청산할 봉이 없다
+    ii, tt = ii[keep], tt[keep]
+    entry, atr, s1, r1 = f['close'][ii, tt], f['atr'][ii, tt], f['s1'][ii, tt], f['r1'][ii, tt]
+    target = np.where(r1 > entry, r1, np.nan)
+    stops = stop_levels(entry, atr, s1, grid)
+
+    idx = tt[:, None] + 1 + np.arange(horizon)[None, :]
+    ok = idx < T
+    idx = np.minimum(idx, T - 1)
+    o, h, l, c = (v[ii[:, None], idx, k] for k in range(4))
+    ok &= ~np.isnan(c)
+    last_ok = np.where(ok.any(axis=1), horizon - 1 - np.argmax(ok[:, ::-1], axis=1), -1)
+    has_exit = last_ok >= 0
+
+    t_at = _first(ok & (h >= target[:, None]))
+    rows = np.arange(len(ii))
+    out = []
+    for g in range(len(grid)):
+        stop = stops[:, g]
+        s_at = _first(ok & (l <= stop[:, None]))
+        stopped = (s_at < horizon) & (s_at <= t_at)
+        targeted = ~stopped & (t_at < horizon)
+        at = np.where(stopped, s_at, np.where(targeted, t_at, last_ok))
+        at_c = np.clip(at, 0, horizon - 1)
+        price = np.where(stopped, np.fmin(o[rows, at_c], stop),
+                         np.where(targeted, np.fmax(o[rows, at_c], target), c[rows, at_c]))
+        out.append(pd.DataFrame({
+            'grid': np.full(has_exit.sum(), g, dtype=np.int16),
+            'ticker': pd.Categorical.from_codes(ii[has_exit], panel['tickers']) if len(set(panel['tickers'])) == N
+                      else np.asarray(panel['tickers'], dtype=object)[ii[has_exit]],
+            'date': panel['dates'][ii, tt][has_exit],
+            'code': codes[ii, tt][has_exit].astype(np.int8),
+            'entry': entry[has_exit], 'exit': price[has_exit],
+            'ret': (price / entry - 1)[has_exit],
+            'outcome': pd.Categorical.from_codes(np.where(stopped, 1, np.where(targeted, 0, 2))[has_exit], OUTCOMES),
+            'days': (at + 1)[has_exit].astype(np.int16),
+        }))
+    return pd.concat(out, ignore_index=True) if out else pd.DataFrame()
+
+def forward_returns(panel, codes, horizon=HORIZON):
+    # 모든 신호 봉의 horizon 봉 뒤 종가 수익률 (매도 신호의 적중 = 하락)
+    close = panel['values'][:, :, 3]
+    N, T = close.shape
+    fwd = np.full((N, T), np.nan)
+    if T > horizon: fwd[:, :-horizon] = close[:, horizon:] / close[:, :-horizon] - 1
+    ii, tt = np.nonzero((codes >= 0) & ~np.isnan(fwd))
+    return pd.DataFrame({'code': codes[ii, tt].astype(np.int8), 'fwd_ret': fwd[ii, tt]})
+
+# --- 3. 요약 ---
+def _rules_of(rules):
+    # → {이름: RuleSet}, 기본 세트. 거래/신호 표에 rules 열이 있으면 행마다 그 이름의 세트로 신호 이름을 붙인다
+    rulesets = [compile_rules(r) for r in (rules if isinstance(rules, (list, tuple)) else [rules or DEFAULT])]
+    return {r.name: r for r in rulesets}, rulesets[0]
+
+def _signal_names(df, rules):
+    by_name, first = _rules_of(rules)
+    names = df['rules'] if 'rules' in df.columns else [first.name] * len(df)
+    return [by_name.get(name, first).signals[code][0] for name, code in zip(names, df['code'])]
+
+def summarize_trades(trades, grid, rules=None):
+    if trades.empty: return pd.DataFrame()
+    keys = (['rules'] if 'rules' in trades.columns else []) + ['grid', 'code']
+    g = trades.groupby(keys, observed=True)
+    out = pd.DataFrame({
+        'trades': g.size(),
+        'win_rate': g['ret'].apply(lambda r: (r > 0).mean()),
+        'target_rate': g['outcome'].apply(lambda o: (o == 'target').mean()),
+        'stop_rate': g['outcome'].apply(lambda o: (o == 'stop').mean()),
+        'avg_ret': g['ret'].mean(), 'median_ret': g['ret'].median(), 'avg_days': g['days'].mean(),
+    }).reset_index()
+    out.insert(out.columns.get_loc('grid') + 1, 'params', out['grid'].map(lambda i: describe(grid[i])))
+    out.insert(out.columns.get_loc('code') + 1, 'signal', _signal_names(out, rules))
+    return out
+
+def summarize_signals(fwd, rules=None):
+    if fwd.empty: return pd.DataFrame()
+    by_name, first = _rules_of(rules)
+    names = fwd['rules'] if 'rules' in fwd.columns else pd.Series(first.name, index=fwd.index)
+    side = np.zeros(len(fwd))  # 1 = 매수 신호, -1 = 매도 신호
+    for name, r in by_name.items():
+        mine = (names == name).to_numpy()
+        side[mine & np.isin(fwd['code'], r.buy_codes)] = 1
+        side[mine & np.isin(fwd['code'], r.sell_codes)] = -1
+    fwd = fwd.assign(hit=np.where(side > 0, fwd['fwd_ret'] > 0, np.where(side < 0, fwd['fwd_ret'] < 0, np.nan)))
+    keys = (['rules'] if 'rules' in fwd.columns else []) + ['code']
+    g = fwd.groupby(keys)
+    out = pd.DataFrame({'signals': g.size(), 'hit_rate': g['hit'].mean(), 'avg_fwd_ret': g['fwd_ret'].mean(),
+                        'median_fwd_ret': g['fwd_ret'].median()}).reset_index()
+    out.insert(out.columns.get_loc('code') + 1, 'signal', _signal_names(out, rules))
+    return out
+
+def describe(params):
+    mode = params['stop_loss_mode']
+    if mode == STOP_LOSS_MODES['atr']: return f"ATR k={params.get('atr_multiplier', 2.0):g}"
+    if mode == STOP_LOSS_MODES['pivot']: return "피봇 S1"
+    return f"고정 {params.get('stop_loss_pct', 3.0):g}%"
+
+# --- 4. 실행 (티커 청크 × 프로세스 풀) ---
+def backtest_panel(panel, grid, horizon=HORIZON, rules=None):
+    # rules 가 규칙 세트 목록이면 세트마다 신호/거래를 내고 rules 열로 구분한다
+    f = bar_features(panel)
+    if not isinstance(rules, (list, tuple)):
+        codes = bar_signals(f, rules)
+        return simulate(panel, codes, f, grid, horizon, rules), forward_returns(panel, codes, horizon)
+    trades, fwd = [], []
+    for r in map(compile_rules, rules):
+        codes = bar_signals(f, r)
+        trades.append(simulate(panel, codes, f, grid, horizon, r).assign(rules=r.name))
+        fwd.append(forward_returns(panel, codes, horizon).assign(rules=r.name))
+    return pd.concat(trades, ignore_index=True), pd.concat(fwd, ignore_index=True)
+
+def _backtest_chunk(job):
+    tickers, period, store_root, grid, horizon, rules = job
+    panel, _, _ = load_panel(tickers, BarStore(store_root), period=period)
+    return backtest_panel(panel, grid, horizon, rules)
+
+def backtest(tickers, grid, period="10y", horizon=HORIZON, workers=None, chunk_size=100, store_root=None, rules=None):
+    # → (trades, forward) DataFrame
+    chunks = [tickers[i:i + chunk_size] for i in range(0, len(tickers), chunk_size)]
+    jobs = [(chunk, period, store_root, grid, horizon, rules) for chunk in chunks]
+    if workers == 1 or len(chunks) <= 1: outputs = [_backtest_chunk(job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool: outputs = list(pool.map(_backtest_chunk, jobs))
+    trades = pd.concat([o[0] for o in outputs if not o[0].empty], ignore_index=True) if outputs else pd.DataFrame()
+    fwd = pd.concat([o[1] for o in outputs], ignore_index=True) if outputs else pd.DataFrame()
+    if not trades.empty: trades['ticker'] = trades['ticker'].astype(str)
+    return trades, fwd
+
+def make_grid(modes, atr_ks, pcts):
+    grid = []
+    for mode in modes:
+        if mode == 'atr': grid += [{'stop_loss_mode': STOP_LOSS_MODES['atr'], 'atr_multiplier': k} for k in atr_ks]
+        elif mode == 'pct': grid += [{'stop_loss_mode': STOP_LOSS_MODES['pct'], 'stop_loss_pct': p} for p in pcts]
+        else: grid.append({'stop_loss_mode': STOP_LOSS_MODES['pivot']})
+    return grid
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Quant Screener v14.3 backtest")
+    parser.add_argument('tickers', nargs='*', help="티커 (쉼표/공백 구분)")
+    parser.add_argument('--file', action='append', default=[], help="티커 목록 파일 (여러 번 지정 가능)")
+    parser.add_argument('--market', choices=MARKETS, default='us')
+    parser.add_argument('--period', default='10y')
+    parser.add_argument('--horizon', type=int, default=HORIZON, help="최대 보유 봉 수")
+    parser.add_argument('--stop-loss', nargs='+', choices=STOP_LOSS_MODES, default=['atr', 'pivot', 'pct'])
+    parser.add_argument('--atr-k', nargs='+', type=float, default=[2.0])
+    parser.add_argument('--pct', nargs='+', type=float, default=[3.0])
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--chunk', type=int, default=100)
+    parser.add_argument('--data-dir', help="일봉 저장소 경로")
+    parser.add_argument('--out', default='backtest_summary.csv', help="등급별 요약 (.csv 또는 .parquet)")
+    parser.add_argument('--signals-out', help="신호별 horizon 뒤 수익률 요약 저장 경로")
+    parser.add_argument('--trades', help="개별 거래 저장 경로")
+    parser.add_argument('--rules', action='append', default=[], help="규칙 세트 JSON (여러 번 지정 가능, 기본 v14.3)")
+    args = parser.parse_intermixed_args(argv)
+
+    market = MARKETS[args.market]
+    krx = KrxCodeTable() if market == KOREA else None
+    raw = [t for arg in args.tickers for t in arg.split(',')] + [t for path in args.file for t in read_ticker_file(path)]
+    tickers = list(dict.fromkeys(normalize_tickers(raw, market, krx)))
+    if not tickers: parser.error("분석할 종목을 입력해주세요.")
+
+    try: rulesets = [r for path in args.rules for r in load_rules(path)]
+    except (OSError, ValueError) as e: parser.error(f"규칙 세트를 읽을 수 없습니다: {e}")
+    rules = rulesets if len(rulesets) > 1 else (rulesets[0] if rulesets else None)
+
+    grid = make_grid(args.stop_loss, args.atr_k, args.pct)
+    trades, fwd = backtest(tickers, grid, args.period, args.horizon, args.workers, args.chunk, args.data_dir, rules)
+    summary = summarize_trades(trades, grid, rules)
+    if not summary.empty: write_table(summary, args.out)
+    if args.signals_out: write_table(summarize_signals(fwd, rules), args.signals_out)
+    if args.trades and not trades.empty: write_table(trades, args.trades)
+    runs = max(len(grid), 1) * max(len(rulesets), 1)
+    print(f"백테스트 완료: 거래 {len(trades) // runs}건 × 파라미터 {len(grid)}개 × 규칙 {max(len(rulesets), 1)}개 → {args.out}", file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,124 @@
+# 오프라인 벤치마크 (단계별 시간)
+# fakes.FakeMarket 으로 네트워크를 대신하고 종목 수를 바꿔 가며 단계마다 시간을 잰다.
+# 결과는 JSON Lines 로 누적 저장해 버전(커밋) 사이를 비교한다.
+#   python bench.py --sizes 10 100 1000 5000 --out bench_results.jsonl
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import pandas as pd
+import yfinance as yf
+
+from engine import KOREA, panel_from_batch, inject_ticks, analyze_panel, analyze_dataframe
+from fakes import FakeMarket
+from names import SymbolDirectory
+from realtime import fetch_snapshots, as_ticks
+from scan import US, scan, scan_stream, rank_results, style_results, RankedResults
+from store import BarStore, split_batch
+
+SIZES = (10, 100, 1000, 5000)
+STAGES = ('download_parse', 'flatten', 'realtime', 'inject', 'analyze', 'analyze_dataframe', 'names', 'names_warm', 'style', 'scan',
+          'scan_stream')
+PER_TICKER_MAX = 1000  # analyze_dataframe (티커별 호출) 은 이 종목 수까지만 잰다
+STOP_LOSS = "ATR 기반 (권장)"
+
+def universe(n, market):
+    if market == KOREA: return [f"{100000 + i:06d}.{'KS' if i % 2 else 'KQ'}" for i in range(n)]
+    return [f"B{i:04d}" for i in range(n)]
+
+def git_rev():
+    try:
+        out = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                             cwd=os.path.dirname(os.path.abspath(__file__)))
+        return out.stdout.strip() or 'unknown'
+    except OSError: return 'unknown'
+
+def best_of(repeat, fn):
+    # → (최솟값 초, 마지막 반환값)
+    times, out = [], None
+    for _ in range(repeat):
+        t = time.perf_counter()
+        out = fn()
+        times.append(time.perf_counter() - t)
+    return min(times), out
+
+def run_size(n, market=US, repeat=1, latency=0.0):
+    tickers = universe(n, market)
+    fake = FakeMarket(latency=latency)
+    for t in tickers: fake.bars(t)  # 합성 데이터 생성은 측정에서 뺀다
+    timings = {}
+    with fake.installed(), tempfile.TemporaryDirectory() as tmp:
+        def stage(name, fn):
+            timings[name], out = best_of(repeat, fn)
+            return out
+
+        batch = yf.download(tickers, period="1y", group_by='ticker', progress=False)
+        panel, _ = stage('download_parse', lambda: panel_from_batch(yf.download(tickers, period="1y", group_by='ticker', progress=False), tickers))
+        stage('flatten', lambda: split_batch(batch, tickers))
+        ticks = stage('realtime', lambda: as_ticks(fetch_snapshots(tickers)))
+        panel, labels = stage('inject', lambda: inject_ticks(panel, ticks))
+        results = stage('analyze', lambda: analyze_panel(panel, labels, STOP_LOSS, market))
+        if n <= PER_TICKER_MAX:
+            frames = split_batch(batch, tickers)
+            stage('analyze_dataframe', lambda: [analyze_dataframe(t, frames[t], labels.get(t, "정규장 종가"), STOP_LOSS, market) for t in frames])
+        stage('names', lambda: SymbolDirectory(os.path.join(tmp, f"symbols_{time.perf_counter_ns()}.json")).resolve(tickers))
+        warm = SymbolDirectory(os.path.join(tmp, "symbols_warm.json"))
+        warm.resolve(tickers)
+        stage('names_warm', lambda: warm.resolve(tickers))
+        rows = [{**r, "종목명": warm.get(r["티커"])} for r in results if "현재가" in r]
+        if rows: stage('style', lambda: style_results(rank_results(rows), market).to_html())
+        stage('scan', lambda: scan(tickers, market, STOP_LOSS, store=BarStore(os.path.join(tmp, f"bars_{time.perf_counter_ns()}"))))
+        def streamed():
+            ranked = RankedResults()
+            for results, errors in scan_stream(tickers, market, STOP_LOSS, store=BarStore(os.path.join(tmp, f"bars_{time.perf_counter_ns()}"))):
+                ranked.add(results, errors)
+            return ranked.frame()
+        stage('scan_stream', streamed)
+    return timings
+
+def load_records(path):
+    try:
+        with open(path, encoding='utf-8') as f: return [json.loads(line) for line in f if line.strip()]
+    except OSError: return []
+
+def report(records, rev):
+    # 이번 실행 표 + 같은 파일에 있는 직전 다른 버전 대비 배율
+    df = pd.DataFrame(records)
+    cur = df[df['rev'] == rev].drop_duplicates(['n', 'stage'], keep='last').pivot(index='stage', columns='n', values='seconds')
+    cur = cur.reindex([s for s in STAGES if s in cur.index])
+    lines = [f"[{rev}] 단계별 시간 (초)", cur.to_string(float_format=lambda x: f"{x:.4f}")]
+    older = df[df['rev'] != rev]
+    if not older.empty:
+        base_rev = older['rev'].iloc[-1]
+        base = older[older['rev'] == base_rev].drop_duplicates(['n', 'stage'], keep='last').pivot(index='stage', columns='n', values='seconds')
+        ratio = (cur / base).reindex(cur.index)
+        lines += [f"[{rev}] / [{base_rev}] 배율 (1 미만 = 빨라짐)", ratio.to_string(float_format=lambda x: f"{x:.2f}")]
+    return "\n".join(lines)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Quant Screener offline benchmark")
+    parser.add_argument('--sizes', nargs='+', type=int, default=list(SIZES))
+    parser.add_argument('--market', choices=['us', 'kr'], default='us')
+    parser.add_argument('--repeat', type=int, default=1, help="단계마다 반복해 최솟값을 기록")
+    parser.add_argument('--latency', type=float, default=0.0, help="가짜 요청마다 쉬는 시간 (초)")
+    parser.add_argument('--out', default='bench_results.jsonl', help="결과 누적 파일 (JSON Lines)")
+    args = parser.parse_args(argv)
+
+    market = KOREA if args.market == 'kr' else US
+    rev, stamp = git_rev(), pd.Timestamp.now().isoformat(timespec='seconds')
+    records = []
+    for n in args.sizes:
+        for name, seconds in run_size(n, market, args.repeat, args.latency).items():
+            records.append({'rev': rev, 'time': stamp, 'market': args.market, 'n': n, 'stage': name, 'seconds': seconds})
+        print(f"{n} 종목 완료", file=sys.stderr)
+    with open(args.out, 'a', encoding='utf-8') as f:
+        for r in records: f.write(json.dumps(r) + "\n")
+    print(report([r for r in load_records(args.out) if r.get('market') == args.market], rev))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
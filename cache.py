@@ -0,0 +1,55 @@
+# 분석 상태 LRU 캐시 (메모리 상한)
+# 손절 파라미터와 무관한 종목별 분석 상태를 보관한다. 키는 engine.state_keys 가 만든다.
+import sys
+import threading
+from collections import OrderedDict
+
+MAX_BYTES = 64 << 20
+
+def _sizeof(obj):
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict): size += sum(_sizeof(k) + _sizeof(v) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple)): size += sum(_sizeof(v) for v in obj)
+    return size
+
+class LRUCache:
+    def __init__(self, max_bytes=MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.hits = self.misses = 0
+        self._lock = threading.Lock()
+        self._data = OrderedDict()  # key → (value, size)
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value):
+        size = _sizeof(key) + _sizeof(value)
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None: self.bytes -= old[1]
+            if size > self.max_bytes: return
+            self._data[key] = (value, size)
+            self.bytes += size
+            # 상한을 넘으면 가장 오래 안 쓴 항목부터 버린다
+            while self.bytes > self.max_bytes:
+                _, (_, evicted) = self._data.popitem(last=False)
+                self.bytes -= evicted
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.bytes = 0
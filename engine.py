@@ -0,0 +1,344 @@
+# 벡터화 지표 엔진 (v14.3 분석 로직의 패널 버전)
+# 배치 전체를 (티커 × 날짜 × 필드) 패널 하나로 적재하고, 지표·레벨·점수를 티커축 벡터 연산으로 한 번에 계산한다.
+import hashlib
+
+import numpy as np
+import pandas as pd
+
+from metrics import record
+from rules import DEFAULT, compile_rules
+
+FIELDS = ('open', 'high', 'low', 'close', 'volume')
+SMA_LENGTHS = (20, 60, 120, 200)
+RSI_LENGTH, BB_LENGTH, BB_STD, ATR_LENGTH = 14, 20, 2.0, 14
+FIB_PERIOD, MAX_VOL_PERIOD = 120, 240
+EPS = np.finfo(float).eps  # pandas_ta non_zero_range 보정값
+
+KOREA = '한국 증시 (Korea)'
+LEVEL_COLUMN = "레벨(지지/저항)"  # levels 를 넘겼을 때 붙는 열: 현재가 밴드 안 아래/위 다중 시간대 레벨 수
+# 기본 규칙 세트 (v14.3) 의 지지/저항 이름과 (신호, 색상) - 인덱스가 곧 신호 코드
+SUPPORT_NAMES, RESISTANCE_NAMES = DEFAULT.support_names, DEFAULT.resistance_names
+SIGNALS, BUY_SIGNALS = DEFAULT.signals, DEFAULT.buy_codes
+
+# --- 1. 패널 적재 ---
+def _make_panel(tickers, values, dates, aux_ok, has_extra):
+    length = (~np.isnat(dates)).sum(axis=1)
+    return {'tickers': list(tickers), 'values': values, 'dates': dates, 'aux_ok': aux_ok,
+            'has_extra': has_extra, 'length': length}
+
+def _naive_dates(index):
+    index = pd.DatetimeIndex(index)
+    if index.tz is not None: index = index.tz_localize(None)
+    return index.values.astype('datetime64[ns]')
+
+def normalize_frame(df):
+    # MultiIndex Flatten + 소문자 컬럼 (단일 티커 download 의 (Price, Ticker) 형태도 처리)
+    df = df.copy()
+    if isinstance(df.columns, pd.MultiIndex):
+        levels = range(df.columns.nlevels)
+        level = next((i for i in levels if 'close' in df.columns.get_level_values(i).str.lower()), -1)
+        df.columns = df.columns.get_level_values(level)
+    df.columns = df.columns.str.lower()
+    return df
+
+def panel_from_batch(batch, tickers):
+    # yf.download(..., group_by='ticker') 결과를 reshape 한 번으로 패널화. 배치에 없는 티커는 따로 반환
+    if batch.empty: return panel_from_frames({}), list(tickers)
+    if not isinstance(batch.columns, pd.MultiIndex):
+        return panel_from_frames({tickers[0]: normalize_frame(batch)}), []
+    level0 = set(batch.columns.get_level_values(0))
+    present = [t for t in tickers if t in level0]
+    missing = [t for t in tickers if t not in level0]
+    sub = batch[present] if present else batch.iloc[:, :0]
+    fields = [str(f).lower() for f in sub.columns.get_level_values(-1)]
+    n_cols = len(fields) // max(len(present), 1)
+    order = [fields[:n_cols].index(f) for f in FIELDS]
+    raw = sub.to_numpy(dtype=float).reshape(len(sub), len(present), n_cols).transpose(1, 0, 2)
+    values = np.ascontiguousarray(raw[:, :, order])
+    extra = [k for k in range(n_cols) if k not in order]
+    aux_ok = ~np.isnan(raw[:, :, extra]).any(axis=2) if extra else np.ones(raw.shape[:2], dtype=bool)
+    dates = np.broadcast_to(_naive_dates(batch.index), raw.shape[:2]).copy()
+    return _make_panel(present, values, dates, aux_ok, np.full(len(present), bool(extra))), missing
+
+def panel_from_frames(frames):
+    # 티커별 DataFrame(소문자 컬럼)을 오른쪽 정렬로 쌓는다. 앞쪽 패딩은 지표 계산에 영향이 없다
+    tickers = list(frames)
+    T = max((len(df) for df in frames.values()), default=0)
+    values = np.full((len(tickers), T, len(FIELDS)), np.nan)
+    dates = np.full((len(tickers), T), np.datetime64('NaT'), dtype='datetime64[ns]')
+    aux_ok = np.zeros((len(tickers), T), dtype=bool)
+    has_extra = np.zeros(len(tickers), dtype=bool)
+    for i, df in enumerate(frames.values()):
+        L = len(df)
+        if not L: continue
+        values[i, T - L:] = df.reindex(columns=list(FIELDS)).to_numpy(dtype=float)
+        dates[i, T - L:] = _naive_dates(df.index)
+        extra = df.drop(columns=[c for c in FIELDS if c in df.columns])
+        has_extra[i] = len(extra.columns) > 0
+        aux_ok[i, T - L:] = extra.notna().all(axis=1).to_numpy()
+    return _make_panel(tickers, values, dates, aux_ok, has_extra)
+
+def concat_panels(*panels):
+    panels = [p for p in panels if p['tickers']]
+    if not panels: return panel_from_frames({})
+    T = max(p['values'].shape[1] for p in panels)
+    def pad(a, fill):
+        out = np.full((a.shape[0], T) + a.shape[2:], fill, dtype=a.dtype)
+        out[:, T - a.shape[1]:] = a
+        return out
+    return _make_panel(
+        [t for p in panels for t in p['tickers']],
+        np.concatenate([pad(p['values'], np.nan) for p in panels]),
+        np.concatenate([pad(p['dates'], np.datetime64('NaT')) for p in panels]),
+        np.concatenate([pad(p['aux_ok'], False) for p in panels]),
+        np.concatenate([p['has_extra'] for p in panels]),
+    )
+
+def subset_panel(panel, tickers):
+    pos = {t: i for i, t in enumerate(panel['tickers'])}
+    idx = [pos[t] for t in tickers]
+    return _make_panel(tickers, panel['values'][idx], panel['dates'][idx], panel['aux_ok'][idx], panel['has_extra'][idx])
+
+def inject_ticks(panel, ticks):
+    # ticks: {티커: (가격, 체결시각)}. 새 날짜면 합성 봉 추가, 같은 날이면 마지막 종가 덮어쓰기
+    N, T, _ = panel['values'].shape
+    labels = {}
+    if not T: return panel, labels
+    price = np.full(N, np.nan)
+    tick_day = np.full(N, np.datetime64('NaT'), dtype='datetime64[ns]')
+    has_tick = np.zeros(N, dtype=bool)
+    for i, t in enumerate(panel['tickers']):
+        if t not in ticks: continue
+        p, ts = ticks[t]
+        price[i], has_tick[i] = p, True
+        tick_day[i] = np.datetime64(pd.Timestamp(ts.date()), 'ns')
+        labels[t] = ts.strftime("%m-%d %H:%M")
+    append = has_tick & (tick_day.astype('datetime64[D]') > panel['dates'][:, -1].astype('datetime64[D]'))
+    overwrite = has_tick & ~append
+
+    values, dates, aux_ok = panel['values'], panel['dates'], panel['aux_ok']
+    if append.any():
+        # 추가되는 티커는 한 칸 늘어나고, 나머지는 앞에 패딩 한 칸을 받는다 (오른쪽 정렬 유지)
+        values = np.concatenate([np.full((N, 1, len(FIELDS)), np.nan), values], axis=1)
+        dates = np.concatenate([np.full((N, 1), np.datetime64('NaT'), dtype=dates.dtype), dates], axis=1)
+        aux_ok = np.concatenate([np.zeros((N, 1), dtype=bool), aux_ok], axis=1)
+        values[append, :-1] = values[append, 1:]
+        dates[append, :-1] = dates[append, 1:]
+        aux_ok[append, :-1] = aux_ok[append, 1:]
+        values[append, -1] = np.stack([price[append]] * 4 + [np.zeros(append.sum())], axis=1)
+        dates[append, -1] = tick_day[append]
+        aux_ok[append, -1] = ~panel['has_extra'][append]
+    else:
+        values = values.copy()
+    values[overwrite, -1, FIELDS.index('close')] = price[overwrite]
+
+    for i, t in enumerate(panel['tickers']):
+        if t in labels: labels[t] += " (장전/시작)" if append[i] else " (실시간)"
+    return _make_panel(panel['tickers'], values, dates, aux_ok, panel['has_extra']), labels
+
+# --- 2. 윈도우 커널 ---
+# pandas 의 Cython 커널을 (날짜 × 티커) 2차원 블록에 한 번에 적용한다. pandas_ta 가 티커별로
+# 호출하던 것과 같은 커널이라 pandas 버전과 무관하게 결과가 비트 단위로 같다.
+def _by_date(x):
+    return pd.DataFrame(x.T)
+
+def rolling_mean(x, n):
+    return _by_date(x).rolling(n, min_periods=n).mean().to_numpy().T
+
+def rolling_std(x, n, ddof=0):
+    return np.sqrt(_by_date(x).rolling(n, min_periods=n).var(ddof).to_numpy().T)
+
+def rolling_max(x, n, min_periods=1):
+    return _by_date(x).rolling(n, min_periods=min_periods).max().to_numpy().T
+
+def rolling_min(x, n, min_periods=1):
+    return _by_date(x).rolling(n, min_periods=min_periods).min().to_numpy().T
+
+def rma(x, n):
+    # Wilder 평활 (pandas_ta rma)
+    return _by_date(x).ewm(alpha=1.0 / n, min_periods=n).mean().to_numpy().T
+
+# --- 3. 지표 (pandas_ta 0.3.14b 와 동일한 정의) ---
+def price_changes(close):
+    # RSI 입력: 전일 대비 상승분 / 하락분(음수). 첫 봉은 NaN
+    diff = np.full(close.shape, np.nan)
+    diff[:, 1:] = close[:, 1:] - close[:, :-1]
+    return np.where(diff < 0, 0.0, diff), np.where(diff > 0, 0.0, diff)
+
+def true_range(high, low, close, length, zero_range=None):
+    # pandas_ta non_zero_range: 고가=저가 봉이 하나라도 있으면 그 티커의 (고가-저가) 전체에 EPS 를 더한다.
+    # zero_range(티커별 bool)를 주면 그 값으로 EPS 적용 여부를 정한다 (스트리밍 상태가 두 경우를 모두 들고 있을 때)
+    N, T = close.shape
+    hl = high - low
+    if zero_range is None: zero_range = (hl == 0).any(axis=1)
+    hl = hl + np.where(zero_range, EPS, 0.0)[:, None]
+    prev_close = np.full((N, T), np.nan)
+    prev_close[:, 1:] = close[:, :-1]
+    tr = np.fmax(np.fmax(np.abs(hl), np.abs(high - prev_close)), np.abs(prev_close - low))
+    # 오른쪽 정렬이라 티커별 첫 봉 위치가 다르다 (true_range.iloc[:1] = NaN)
+    first = np.clip(T - length, 0, max(T - 1, 0))
+    if T: tr[np.arange(N), first] = np.nan
+    return tr
+
+def compute_indicators(panel):
+    v = panel['values']
+    high, low, close = v[:, :, 1], v[:, :, 2], v[:, :, 3]
+    length = panel['length']
+    ind, has = {}, {}
+    for n in SMA_LENGTHS:
+        ind[f'sma{n}'], has[f'sma{n}'] = rolling_mean(close, n), length >= n
+
+    gains, losses = price_changes(close)
+    pos_avg, neg_avg = rma(gains, RSI_LENGTH), rma(losses, RSI_LENGTH)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        ind['rsi'] = 100.0 * pos_avg / (pos_avg + np.abs(neg_avg))
+    has['rsi'] = length >= RSI_LENGTH
+
+    dev = BB_STD * rolling_std(close, BB_LENGTH)
+    ind['bbm'] = ind['sma20']
+    ind['bbl'], ind['bbu'] = ind['bbm'] - dev, ind['bbm'] + dev
+    has['bbl'] = has['bbu'] = has['bbm'] = length >= BB_LENGTH
+
+    ind['atr'], has['atr'] = rma(true_range(high, low, close, length), ATR_LENGTH), length >= ATR_LENGTH
+
+    # df.dropna() 와 같은 유효 행: 원본 컬럼 + 생성된 지표 모두 값이 있는 행
+    valid = panel['aux_ok'] & ~np.isnan(v).any(axis=2)
+    for name, arr in ind.items():
+        valid &= ~np.isnan(arr) | ~has[name][:, None]
+    ind['has'], ind['valid'] = has, valid
+    return ind
+
+# --- 4. 최신 봉 특징 (피벗 / 피보나치 / 최대매물대) ---
+def _take(arr, idx):
+    return arr[np.arange(arr.shape[0]), idx]
+
+def latest_features(panel, ind):
+    v, valid = panel['values'], ind['valid']
+    high, low, close, volume = v[:, :, 1], v[:, :, 2], v[:, :, 3], v[:, :, 4]
+    N, T = valid.shape
+    rank = np.cumsum(valid, axis=1)
+    n_valid = rank[:, -1]
+    last = np.argmax(valid & (rank == n_valid[:, None]), axis=1)
+    prev = np.argmax(valid & (rank == (n_valid - 1)[:, None]), axis=1)
+
+    f = {'n_valid': n_valid, 'has_all': ind['has']['sma200'] & ind['has']['sma60'] & ind['has']['atr'] & ind['has']['bbl']}
+    f['close'] = _take(close, last)
+    for name in ('rsi', 'sma60', 'sma120', 'sma200', 'bbl', 'bbu', 'atr'):
+        f[name] = _take(ind[name], last)
+
+    h, l, c = _take(high, prev), _take(low, prev), _take(close, prev)
+    p = (h + l + c) / 3
+    f['p'], f['s1'], f['r1'] = p, (2 * p) - h, (2 * p) - l
+    f['s2'], f['r2'] = p - (h - l), p + (h - l)
+
+    fib_win = valid & (rank > (n_valid - FIB_PERIOD)[:, None])
+    max_h = np.where(fib_win, high, -np.inf).max(axis=1)
+    min_l = np.where(fib_win, low, np.inf).min(axis=1)
+    diff = max_h - min_l
+    f['fib_618'], f['fib_500'] = max_h - (diff * 0.618), max_h - (diff * 0.5)
+    f['swing_high'], f['swing_low'] = max_h, min_l
+
+    vol_win = valid & (rank > (n_valid - MAX_VOL_PERIOD)[:, None])
+    f['max_vol_price'] = _take(close, np.argmax(np.where(vol_win, volume, -np.inf), axis=1))
+    return f
+
+# --- 5. 점수 / 신호 (티커축 벡터화, 규칙은 rules.py) ---
+def score_features(f, rules=None):
+    return (rules or DEFAULT).evaluate(f)
+
+# --- 6. 결과 행 ---
+def stop_loss_info(close, atr, s1, currency, stop_loss_mode, **kwargs):
+    if stop_loss_mode == "ATR 기반 (권장)":
+        val = close - (atr * kwargs.get('atr_multiplier', 2.0))
+        return f"{currency}{val:,.0f} (-{round((close-val)/close*100,1)}%)"
+    if stop_loss_mode == "피봇 지지선 (S1) 기준":
+        return f"{currency}{s1:,.0f}" if s1 > 0 else "불가"
+    pct = kwargs.get('stop_loss_pct', 3.0)
+    val = close * (1 - pct/100)
+    return f"{currency}{val:,.0f} (-{pct}%)"
+
+def build_states(tickers, f, s, rules=None):
+    # 손절 파라미터와 무관한 종목별 분석 상태 (캐시 단위). 손절가·체결시간은 finalize_state 에서 붙인다
+    rules = rules or DEFAULT
+    out = []
+    for i, ticker in enumerate(tickers):
+        if f['n_valid'][i] < 5: out.append({"티커": ticker, "신호": "데이터 부족"}); continue
+        if not f['has_all'][i]: out.append({"티커": ticker, "신호": "지표 실패"}); continue
+        out.append({
+            "티커": ticker, "신호": rules.describe(i, f, s), "현재가": f['close'][i], "목표가": f['r1'][i],
+            "피보나치(0.618)": f['fib_618'][i], "RSI": f['rsi'][i], "추세": "상승" if s['up'][i] else "하락",
+            "color": rules.signals[int(s['code'][i])][1], "atr": f['atr'][i], "s1": f['s1'][i],
+        })
+        if 'mtf_sup' in f: out[-1][LEVEL_COLUMN] = f"{f['mtf_sup'][i]}/{f['mtf_res'][i]}"
+    return out
+
+def finalize_state(state, rt_label, stop_loss_mode, market, **kwargs):
+    if "atr" not in state: return dict(state)
+    close = state["현재가"]
+    currency = "₩" if market == KOREA else "$"
+    out = {
+        "티커": state["티커"], "신호": state["신호"], "현재가": close, "체결시간": rt_label or "정규장 종가",
+        "손절가": stop_loss_info(close, state["atr"], state["s1"], currency, stop_loss_mode, **kwargs),
+        "목표가": state["목표가"], "피보나치(0.618)": state["피보나치(0.618)"], "RSI": state["RSI"],
+        "추세": state["추세"], "color": state["color"]
+    }
+    for key in ("규칙", LEVEL_COLUMN):
+        if key in state: out[key] = state[key]
+    return out
+
+def build_results(tickers, f, s, rt_labels, stop_loss_mode, market, **kwargs):
+    return [finalize_state(st, rt_labels.get(st["티커"]), stop_loss_mode, market, **kwargs) for st in build_states(tickers, f, s)]
+
+def state_keys(panel):
+    # (티커, 마지막 봉 시각, 마지막 체결가, 이력 digest) - 배당/분할로 과거 봉이 바뀌어도 같은 키가 되지 않도록 이력까지 본다
+    keys = []
+    for i, ticker in enumerate(panel['tickers']):
+        n = panel['length'][i]
+        if not n: keys.append((ticker, None, None, None)); continue
+        row = panel['values'][i, -n:]
+        digest = hashlib.blake2b(row.tobytes() + panel['aux_ok'][i, -n:].tobytes(), digest_size=8).hexdigest()
+        keys.append((ticker, int(panel['dates'][i, -1].astype('int64')), float(row[-1, 3]), digest))
+    return keys
+
+def _compute_states(panel, rulesets, levels=None):
+    # 지표/특징은 한 번만 계산하고 규칙 세트마다 점수만 다시 낸다 → [states] (rulesets 순서)
+    # levels(levels.LevelIndex) 가 있으면 다중 시간대 레벨 특징 (mtf_sup / mtf_res / vp_poc) 을 더하고 상태에 레벨 열을 붙인다
+    if not panel['values'].shape[1]: return [[{"티커": t, "신호": "데이터 부족"} for t in panel['tickers']] for _ in rulesets]
+    with np.errstate(invalid='ignore'):
+        ind = compute_indicators(panel)
+        f = latest_features(panel, ind)
+        if levels is not None: f.update(levels.confluence(panel['tickers'], f['close']))
+        scores = [score_features(f, rules) for rules in rulesets]
+    return [build_states(panel['tickers'], f, s, rules) for s, rules in zip(scores, rulesets)]
+
+def analyze_rulesets(panel, rulesets, cache=None, levels=None):
+    # → [states] (rulesets 순서). cache(LRUCache) 가 있으면 (상태 키, 규칙 세트) 가 바뀐 것만 다시 계산한다.
+    # 반환한 상태 dict 는 캐시와 공유되므로 수정하지 않는다. levels 는 확정 봉이 바뀐 티커만 먼저 갱신한다
+    rulesets = [compile_rules(r) for r in rulesets]
+    if levels is not None: levels.update(panel)
+    if cache is None: return _compute_states(panel, rulesets, levels)
+    # 레벨은 이력에서만 나오므로 (상태 키에 이미 들어 있다) 밴드만 키에 더한다
+    band = None if levels is None else levels.band
+    keys = [[(*k, rules.key, band) for k in state_keys(panel)] for rules in rulesets]
+    states = [[cache.get(k) for k in ks] for ks in keys]
+    todo = [i for i in range(len(panel['tickers'])) if any(sts[i] is None for sts in states)]
+    record('cache_hit', len(panel['tickers']) - len(todo))
+    record('cache_miss', len(todo))
+    if todo:
+        fresh = _compute_states(subset_panel(panel, [panel['tickers'][i] for i in todo]), rulesets, levels)
+        for ks, sts, new in zip(keys, states, fresh):
+            for i, st in zip(todo, new):
+                sts[i] = st
+                cache.put(ks[i], st)
+    return states
+
+def analyze_states(panel, cache=None, rules=None, levels=None):
+    return analyze_rulesets(panel, [rules or DEFAULT], cache, levels)[0]
+
+def analyze_panel(panel, rt_labels, stop_loss_mode, market, cache=None, rules=None, **kwargs):
+    return [finalize_state(st, rt_labels.get(st["티커"]), stop_loss_mode, market, **kwargs)
+            for st in analyze_states(panel, cache, rules)]
+
+def analyze_dataframe(ticker, df, rt_date_str, stop_loss_mode, market, **kwargs):
+    try: return analyze_panel(panel_from_frames({ticker: df}), {ticker: rt_date_str}, stop_loss_mode, market, **kwargs)[0]
+    except Exception as e: return {"티커": ticker, "신호": "오류", "오류 원인": str(e)}
@@ -0,0 +1,214 @@
+# 오프라인 시세 대역 (벤치마크 / 로컬 실행용)
+# yf.download · yf.Ticker(...).history/.info · Naver(종목명/상장 목록) · Yahoo 검색 · JSONBin 을
+# 티커별로 고정된 합성 데이터로 대신한다. 같은 티커는 언제 물어도 같은 봉을 돌려주므로 증분 저장소와도 맞물린다.
+#   market = FakeMarket(kr_codes=["005930", "247540"])
+#   with market.installed(): scan(...)
+# JsonBinServer 는 실제 소켓으로 받는 로컬 JSONBin 대역이다 (제한 시간 / 실패 / 요청 수 확인용).
+#   with JsonBinServer() as server: WatchlistStore(remote=JsonBinRemote("bin", "key", base_url=server.url))
+import contextlib
+import json
+import re
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pandas as pd
+import requests
+import yfinance as yf
+
+from store import period_start
+
+FIELDS = ['Open', 'High', 'Low', 'Close', 'Volume']
+TIMEZONES = {'KR': 'Asia/Seoul', 'US': 'America/New_York'}
+
+def _seed(*parts):
+    return zlib.crc32("|".join(map(str, parts)).encode())
+
+def _is_kr(ticker):
+    return ticker.endswith('.KS') or ticker.endswith('.KQ')
+
+def synthetic_bars(ticker, days=520, end=None):
+    # 어제까지 확정된 일봉 days 개. 종목별 추세/변동성, 가끔 갭, 큰 움직임에 거래량 급증
+    rng = np.random.default_rng(_seed(ticker))
+    end = pd.Timestamp(end or pd.Timestamp.today()).normalize()
+    index = pd.bdate_range(end=end - pd.Timedelta(days=1), periods=days)
+    drift, vol = rng.normal(0.0003, 0.0006), rng.uniform(0.01, 0.035)
+    ret = rng.normal(drift, vol, days)
+    gaps = rng.random(days) < 0.01
+    ret[gaps] += rng.normal(0, 4 * vol, gaps.sum())
+    close = rng.uniform(5, 500) * (1000 if _is_kr(ticker) else 1) * np.exp(np.cumsum(ret))
+    prev = np.concatenate([close[:1], close[:-1]])
+    open_ = prev * (1 + rng.normal(0, vol / 3, days))
+    high = np.maximum(open_, close) * (1 + np.abs(rng.normal(0, vol / 2, days)))
+    low = np.minimum(open_, close) * (1 - np.abs(rng.normal(0, vol / 2, days)))
+    volume = rng.lognormal(np.log(rng.uniform(1e4, 1e7)), 0.5, days) * (1 + 3 * (np.abs(ret) > 2 * vol))
+    if _is_kr(ticker): open_, high, low, close = (np.round(x) for x in (open_, high, low, close))
+    return pd.DataFrame({'Open': open_, 'High': high, 'Low': low, 'Close': close, 'Volume': np.round(volume)}, index=index)
+
+class FakeResponse:
+    def __init__(self, status_code, data=None):
+        self.status_code = status_code
+        self._data = data
+        self.content = json.dumps(data, ensure_ascii=False).encode() if data is not None else b""
+
+    def json(self):
+        return self._data
+
+    def raise_for_status(self):
+        if self.status_code >= 400: raise requests.HTTPError(f"{self.status_code}")
+
+class FakeMarket:
+    def __init__(self, days=520, kr_codes=(), missing=(), latency=0.0):
+        self.days = days
+        self.kr_codes = list(kr_codes)   # Naver 상장 목록에 나올 6자리 코드 (앞 절반 KOSPI, 뒤 절반 KOSDAQ)
+        self.missing = set(missing)      # 어느 소스에도 없는 티커
+        self.latency = latency           # 요청마다 쉬는 시간 (네트워크 흉내)
+        self.bins = {}                   # JSONBin {bin_id: record}
+        self.calls = []                  # (종류, 대상)
+        self._bars = {}
+
+    def bars(self, ticker):
+        if ticker not in self._bars: self._bars[ticker] = synthetic_bars(ticker, self.days)
+        return self._bars[ticker]
+
+    def _wait(self, kind, target):
+        self.calls.append((kind, target))
+        if self.latency: time.sleep(self.latency)
+
+    # --- yfinance ---
+    def download(self, tickers, period=None, start=None, group_by='column', progress=False, **kwargs):
+        tickers = [tickers] if isinstance(tickers, str) else list(tickers)
+        self._wait('download', tuple(tickers))
+        since = pd.Timestamp(start) if start is not None else period_start(period or "1mo")
+        frames = {}
+        for t in tickers:
+            if t in self.missing: continue
+            df = self.bars(t)
+            frames[t] = df[df.index >= since]
+        if not frames: return pd.DataFrame()
+        batch = pd.concat(frames, axis=1)
+        return batch if group_by == 'ticker' else batch.swaplevel(0, 1, axis=1).sort_index(axis=1)
+
+    def history(self, ticker, period="1d", interval="1m", prepost=True, **kwargs):
+        # 마지막 1분봉 몇 개: 직전 종가 근처에서 분 단위로 바뀌는 가격 (감시 모드에서 갱신이 보이도록)
+        self._wait('history', ticker)
+        if ticker in self.missing: return pd.DataFrame(columns=FIELDS)
+        tz = TIMEZONES['KR' if _is_kr(ticker) else 'US']
+        now = pd.Timestamp.now(tz=tz).floor('min')
+        index = pd.date_range(end=now, periods=5, freq='min')
+        last = self.bars(ticker)['Close'].iloc[-1]
+        drift = np.random.default_rng(_seed(ticker, now.value)).normal(0, 0.01, 5)
+        price = last * (1 + np.cumsum(drift) / 5)
+        if _is_kr(ticker): price = np.round(price)
+        return pd.DataFrame({'Open': price, 'High': price, 'Low': price, 'Close': price, 'Volume': 100.0}, index=index)
+
+    def ticker(self, symbol, **kwargs):
+        market = self
+
+        class Ticker:
+            def __init__(self):
+                self.ticker = symbol
+                self.info = {} if symbol in market.missing else {'shortName': f"{symbol} Holdings", 'exchange': 'NMS'}
+
+            def history(self, *args, **kw):
+                return market.history(symbol, *args, **kw)
+
+        return Ticker()
+
+    # --- HTTP (Naver / Yahoo 검색 / JSONBin) ---
+    def get(self, url, params=None, **kwargs):
+        self._wait('http', url)
+        params = params or {}
+        m = re.search(r"/api/stock/(\d{6})/integration", url)
+        if m: return FakeResponse(200, {'stockName': f"종목{m.group(1)}"})
+        m = re.search(r"/api/stocks/marketValue/(KOSPI|KOSDAQ)", url)
+        if m: return FakeResponse(200, self._listing(m.group(1), int(params.get('page', 1)), int(params.get('pageSize', 100))))
+        if "finance/search" in url:
+            q = params.get('q', '')
+            quotes = [] if q in self.missing else [{'symbol': q, 'shortname': f"{q} Holdings", 'exchDisp': 'NASDAQ'}]
+            return FakeResponse(200, {'quotes': quotes})
+        m = re.search(r"api\.jsonbin\.io/v3/b/([^/]+)/latest", url)
+        if m: return FakeResponse(200, {'record': self.bins.get(m.group(1), {})})
+        return FakeResponse(404, {})
+
+    def put(self, url, json=None, **kwargs):
+        self._wait('http', url)
+        m = re.search(r"api\.jsonbin\.io/v3/b/([^/]+)$", url)
+        if not m: return FakeResponse(404, {})
+        self.bins[m.group(1)] = json
+        return FakeResponse(200, {'record': json})
+
+    def _listing(self, market, page, size):
+        half = len(self.kr_codes) // 2
+        codes = self.kr_codes[:half] if market == 'KOSPI' else self.kr_codes[half:]
+        chunk = codes[(page - 1) * size: page * size]
+        return {'stocks': [{'itemCode': c, 'stockName': f"종목{c}"} for c in chunk], 'totalCount': len(codes)}
+
+    @contextlib.contextmanager
+    def installed(self):
+        # yfinance / requests 의 네트워크 진입점을 이 객체로 바꿨다가 되돌린다
+        saved = (yf.download, yf.Ticker, requests.get, requests.put, requests.Session.get, requests.Session.put)
+        yf.download, yf.Ticker = self.download, self.ticker
+        requests.get, requests.put = self.get, self.put
+        requests.Session.get = lambda session, url, **kw: self.get(url, **kw)
+        requests.Session.put = lambda session, url, **kw: self.put(url, **kw)
+        try: yield self
+        finally:
+            yf.download, yf.Ticker, requests.get, requests.put, requests.Session.get, requests.Session.put = saved
+
+class JsonBinServer:
+    """127.0.0.1 임의 포트의 JSONBin v3 대역. GET /v3/b/<id>/latest, PUT /v3/b/<id>."""
+
+    def __init__(self, bins=None, latency=0.0, status=200):
+        self.bins = dict(bins or {})   # {bin_id: record}
+        self.latency = latency         # 요청마다 쉬는 시간 (제한 시간 확인용)
+        self.status = status           # 200 이 아니면 모든 요청을 이 코드로 실패시킨다
+        self.requests = []             # (method, bin_id)
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _reply(self, code, data):
+                body = json.dumps(data, ensure_ascii=False).encode()
+                self.send_response(code)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _bin_id(self, method, pattern):
+                # → bin id, 실패로 응답했으면 None
+                m = re.fullmatch(pattern, self.path)
+                server.requests.append((method, m.group(1) if m else self.path))
+                if server.latency: time.sleep(server.latency)
+                if not m: self._reply(404, {'message': "not found"})
+                elif server.status != 200: self._reply(server.status, {'message': "error"})
+                else: return m.group(1)
+                return None
+
+            def do_GET(self):
+                bin_id = self._bin_id('GET', r"/v3/b/([^/]+)/latest")
+                if bin_id: self._reply(200, {'record': server.bins.get(bin_id, {})})
+
+            def do_PUT(self):
+                body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                bin_id = self._bin_id('PUT', r"/v3/b/([^/]+)")
+                if bin_id:
+                    server.bins[bin_id] = json.loads(body or b"{}")
+                    self._reply(200, {'record': server.bins[bin_id]})
+
+            def log_message(self, *args):
+                pass
+
+        self._httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f"http://127.0.0.1:{self._httpd.server_address[1]}/v3/b"
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._httpd.shutdown()
+        self._httpd.server_close()
@@ -0,0 +1,231 @@
+# 스트리밍 지표 상태 (실시간 틱 → 상수 시간 재계산)
+# 일봉 패널로 한 번 초기화한 뒤, 새 체결가가 들어오면 마지막 봉만 바꿔 SMA·RSI·볼린저·ATR·점수를 다시 낸다.
+# 상태 = (현재 봉 직전까지 확정된 누적값) + (현재 봉). 같은 날 체결은 현재 봉 종가만 교체하고,
+# 날짜가 바뀌면 현재 봉을 누적값에 확정한 뒤 합성 봉(O=H=L=C, V=0)을 새로 연다 - inject_ticks 와 같은 규칙.
+import numpy as np
+
+from engine import (SMA_LENGTHS, RSI_LENGTH, BB_LENGTH, BB_STD, ATR_LENGTH, FIB_PERIOD, MAX_VOL_PERIOD, EPS,
+                    compute_indicators, latest_features, score_features, build_states, analyze_states,
+                    subset_panel, inject_ticks, price_changes, true_range)
+from rules import DEFAULT
+
+SMA_WINDOW = max(SMA_LENGTHS) - 1   # 현재 봉 이전에 들고 있어야 하는 종가 수
+HIST_WINDOW = MAX_VOL_PERIOD - 1    # 피보나치/최대매물대용 확정 봉 (고가, 저가, 종가, 거래량)
+
+# --- Wilder 평활 (pandas ewm(adjust=True) 재귀식 그대로 - 전체 재계산과 비트 단위로 같다) ---
+def ewm_state(x, alpha):
+    # x: (N, T) → 마지막 열까지 반영한 (weighted, old_wt, nobs)
+    w = x[:, 0].copy()
+    old_wt = np.ones(len(x))
+    nobs = (~np.isnan(w)).astype(int)
+    for j in range(1, x.shape[1]):
+        w, old_wt, nobs = ewm_step((w, old_wt, nobs), x[:, j], alpha)
+    return w, old_wt, nobs
+
+def ewm_step(state, cur, alpha):
+    w, old_wt, nobs = state
+    obs = ~np.isnan(cur)
+    has_w = ~np.isnan(w)
+    old_wt = np.where(has_w, old_wt * (1.0 - alpha), old_wt)
+    mixed = has_w & obs & (w != cur)
+    with np.errstate(invalid='ignore'):
+        new_w = np.where(mixed, (old_wt * w + cur) / (old_wt + 1.0), w)
+    new_w = np.where(~has_w & obs, cur, new_w)
+    old_wt = np.where(has_w & obs, old_wt + 1.0, old_wt)
+    return new_w, old_wt, nobs + obs
+
+def ewm_value(state, cur, alpha, min_periods):
+    w, _, nobs = ewm_step(state, cur, alpha)
+    return np.where(nobs >= min_periods, w, np.nan)
+
+class StreamState:
+    """패널 전체 티커의 스트리밍 상태. 추적할 수 없는 티커(지표 부족, 결측 봉, 추가 컬럼)는 패널 재계산으로 처리한다."""
+
+    def __init__(self, panel, labels=None, rules=None):
+        self.rules = rules or DEFAULT
+        self.tickers = list(panel['tickers'])
+        self.pos = {t: i for i, t in enumerate(self.tickers)}
+        self.labels = dict(labels or {})
+        N, T, _ = panel['values'].shape
+        with np.errstate(invalid='ignore'):
+            ind = compute_indicators(panel)
+            f = latest_features(panel, ind)
+        valid, n_valid = ind['valid'], f['n_valid']
+        first = np.argmax(valid, axis=1)
+        tail_ok = ~np.isnan(panel['values'][:, -SMA_WINDOW - 1:]).any(axis=(1, 2)) if T > SMA_WINDOW else np.zeros(N, dtype=bool)
+        self.ok = (f['has_all'] & (n_valid >= 5) & ~panel['has_extra'] & (first == T - n_valid) & tail_ok)
+
+        # 오른쪽 정렬 패널을 버퍼 길이만큼 왼쪽 패딩
+        width = max(SMA_WINDOW, HIST_WINDOW) + 1
+        pad = max(width - T, 0)
+        v = np.concatenate([np.full((N, pad, 5), np.nan), panel['values']], axis=1)
+        valid = np.concatenate([np.zeros((N, pad), dtype=bool), valid], axis=1)
+        high, low, close = v[:, :, 1], v[:, :, 2], v[:, :, 3]
+
+        self.bar = v[:, -1].copy()
+        self.day = panel['dates'][:, -1].astype('datetime64[D]') if T else np.full(N, np.datetime64('NaT'), 'datetime64[D]')
+        self.n_valid = n_valid.copy()
+        self.synthetic = np.array([self.labels.get(t, '').endswith("(장전/시작)") for t in self.tickers], dtype=bool)
+
+        # SMA / 볼린저: 직전 확정 종가 창과 그 합 (볼린저 제곱합은 첫 값 기준으로 이동해 상쇄 오차를 줄인다)
+        self.closes = close[:, -SMA_WINDOW - 1:-1].copy()
+        self.sums = {n: self.closes[:, -(n - 1):].sum(axis=1) for n in SMA_LENGTHS}
+        self.shift = self.closes[:, -1].copy()
+        dev = self.closes[:, -(BB_LENGTH - 1):] - self.shift[:, None]
+        self.bb_sum, self.bb_sq = dev.sum(axis=1), (dev * dev).sum(axis=1)
+
+        # RSI / ATR: 현재 봉 직전까지의 Wilder 평활 상태 (앞쪽 NaN 패딩은 평활 상태를 바꾸지 않는다)
+        gains, losses = price_changes(close)
+        self.gain_state = ewm_state(gains[:, :-1], 1.0 / RSI_LENGTH)
+        self.loss_state = ewm_state(losses[:, :-1], 1.0 / RSI_LENGTH)
+        # ATR 은 고가=저가 봉이 처음 생기면 전체 재계산에서 과거 TR 전부에 EPS 가 붙는다 (pandas_ta) - 두 경우의 상태를 같이 들고 간다
+        self.zero_range = ((high - low) == 0).any(axis=1)
+        self.atr_state = ewm_state(true_range(high, low, close, panel['length'], np.zeros(N, dtype=bool))[:, :-1], 1.0 / ATR_LENGTH)
+        self.atr_state_eps = ewm_state(true_range(high, low, close, panel['length'], np.ones(N, dtype=bool))[:, :-1], 1.0 / ATR_LENGTH)
+
+        # 피벗 (직전 봉) / 피보나치·최대매물대 (직전 유효 봉 창)
+        self.prev = v[:, -2, 1:4].copy()
+        self.hist = v[:, -HIST_WINDOW - 1:-1, 1:].copy()
+        self.hist_ok = valid[:, -HIST_WINDOW - 1:-1].copy()
+        self.fib_hi, self.fib_lo, self.vol_max, self.vol_close = (np.empty(N) for _ in range(4))
+        self._refresh_windows(np.ones(N, dtype=bool))
+
+        # 추적 불가 티커는 패널 그대로 두고 틱 주입 + 전체 계산으로 처리
+        self.fallback = [t for t, ok in zip(self.tickers, self.ok) if not ok]
+        self.fallback_panel = subset_panel(panel, self.fallback)
+
+    def _refresh_windows(self, rows):
+        hist, ok = self.hist[rows], self.hist_ok[rows]
+        fib_ok = ok[:, -(FIB_PERIOD - 1):]
+        self.fib_hi[rows] = np.where(fib_ok, hist[:, -(FIB_PERIOD - 1):, 0], -np.inf).max(axis=1)
+        self.fib_lo[rows] = np.where(fib_ok, hist[:, -(FIB_PERIOD - 1):, 1], np.inf).min(axis=1)
+        vol = np.where(ok, hist[:, :, 3], -np.inf)
+        top = np.argmax(vol, axis=1)
+        self.vol_max[rows] = vol[np.arange(len(top)), top]
+        self.vol_close[rows] = hist[np.arange(len(top)), top, 2]
+
+    def _commit(self, rows):
+        # 현재 봉을 확정해 누적값으로 옮긴다 (날짜가 바뀔 때만, 창 길이에 비례하는 시프트 한 번)
+        if not rows.any(): return
+        h, l, c, vol = self.bar[rows, 1], self.bar[rows, 2], self.bar[rows, 3], self.bar[rows, 4]
+        prev_c = self.prev[rows, 2]
+        diff = c - prev_c
+        for name, cur in (('gain_state', np.where(diff < 0, 0.0, diff)), ('loss_state', np.where(diff > 0, 0.0, diff))):
+            state = getattr(self, name)
+            step = ewm_step(tuple(s[rows] for s in state), cur, 1.0 / RSI_LENGTH)
+            for s, new in zip(state, step): s[rows] = new
+        for state, eps in ((self.atr_state, False), (self.atr_state_eps, True)):
+            step = ewm_step(tuple(s[rows] for s in state), self._tr(rows, eps), 1.0 / ATR_LENGTH)
+            for s, new in zip(state, step): s[rows] = new
+
+        for n in SMA_LENGTHS: self.sums[n][rows] += c - self.closes[rows, -(n - 1)]
+        shift = self.shift[rows]
+        new, old = c - shift, self.closes[rows, -(BB_LENGTH - 1)] - shift
+        self.bb_sum[rows] += new - old
+        self.bb_sq[rows] += new * new - old * old
+        self.closes[rows] = np.concatenate([self.closes[rows, 1:], c[:, None]], axis=1)
+
+        self.zero_range[rows] |= (h - l) == 0
+        self.prev[rows] = self.bar[rows, 1:4]
+        self.hist[rows] = np.concatenate([self.hist[rows, 1:], np.stack([h, l, c, vol], axis=1)[:, None]], axis=1)
+        self.hist_ok[rows] = np.concatenate([self.hist_ok[rows, 1:], np.ones((rows.sum(), 1), dtype=bool)], axis=1)
+        self._refresh_windows(rows)
+
+    def _eps(self, rows):
+        # 전체 재계산에서 이 티커의 TR 에 EPS 가 붙는지 (확정 봉이나 현재 봉에 고가=저가가 있으면)
+        return self.zero_range[rows] | ((self.bar[rows, 1] - self.bar[rows, 2]) == 0)
+
+    def _tr(self, rows, eps):
+        h, l, pc = self.bar[rows, 1], self.bar[rows, 2], self.prev[rows, 2]
+        hl = h - l + np.where(eps, EPS, 0.0)
+        return np.fmax(np.fmax(np.abs(hl), np.abs(h - pc)), np.abs(pc - l))
+
+    def update(self, ticks):
+        # ticks: {티커: (가격, 체결시각)} → 가격이 바뀐 티커 목록
+        N = len(self.tickers)
+        price = np.full(N, np.nan)
+        day = np.full(N, np.datetime64('NaT'), dtype='datetime64[D]')
+        for t, (p, ts) in ticks.items():
+            i = self.pos.get(t)
+            if i is None: continue
+            price[i], day[i] = p, np.datetime64(ts.date(), 'D')
+        has = ~np.isnan(price) & self.ok
+        append = has & (day > self.day)
+        replace = has & ~append
+        changed = append | (replace & (self.bar[:, 3] != price))
+
+        self._commit(append)
+        self.bar[append] = np.stack([price[append]] * 4 + [np.zeros(append.sum())], axis=1)
+        self.day[append] = day[append]
+        self.n_valid[append] += 1
+        self.synthetic[append] = True
+        self.bar[replace, 3] = price[replace]
+        for i in np.flatnonzero(has):
+            t = self.tickers[i]
+            self.labels[t] = ticks[t][1].strftime("%m-%d %H:%M") + (" (장전/시작)" if self.synthetic[i] else " (실시간)")
+
+        # 추적 불가 티커: 패널에 그대로 주입 (inject_ticks 를 반복 적용해도 같은 규칙)
+        fb_ticks = {t: ticks[t] for t in self.fallback if t in ticks}
+        if fb_ticks:
+            before = self.fallback_panel['values'][:, -1, 3].copy() if self.fallback_panel['values'].shape[1] else None
+            self.fallback_panel, fb_labels = inject_ticks(self.fallback_panel, fb_ticks)
+            self.labels.update(fb_labels)
+            after = self.fallback_panel['values'][:, -1, 3]
+            moved = [t for k, t in enumerate(self.fallback) if t in fb_ticks and (before is None or before[k] != after[k])]
+        else: moved = []
+        return list(dict.fromkeys([t for t, c in zip(self.tickers, changed) if c] + moved))
+
+    def features(self, rows=None):
+        # latest_features 와 같은 키 (추적 티커의 현재 봉 기준)
+        rows = np.ones(len(self.tickers), dtype=bool) if rows is None else rows
+        bar, prev = self.bar[rows], self.prev[rows]
+        h, l, c, vol = bar[:, 1], bar[:, 2], bar[:, 3], bar[:, 4]
+        ok = self.ok[rows]
+        f = {'n_valid': np.where(ok, self.n_valid[rows], 0), 'has_all': ok, 'close': c}
+        for n in SMA_LENGTHS: f[f'sma{n}'] = (self.sums[n][rows] + c) / n
+        with np.errstate(invalid='ignore', divide='ignore'):
+            diff = c - prev[:, 2]
+            pos = ewm_value(tuple(s[rows] for s in self.gain_state), np.where(diff < 0, 0.0, diff), 1.0 / RSI_LENGTH, RSI_LENGTH)
+            neg = ewm_value(tuple(s[rows] for s in self.loss_state), np.where(diff > 0, 0.0, diff), 1.0 / RSI_LENGTH, RSI_LENGTH)
+            f['rsi'] = 100.0 * pos / (pos + np.abs(neg))
+
+            dev = c - self.shift[rows]
+            mean = (self.bb_sum[rows] + dev) / BB_LENGTH
+            var = np.maximum((self.bb_sq[rows] + dev * dev) / BB_LENGTH - mean * mean, 0.0)
+            width = BB_STD * np.sqrt(var)
+            f['bbl'], f['bbu'] = f['sma20'] - width, f['sma20'] + width
+            eps = self._eps(rows)
+            state = tuple(np.where(eps, e[rows], s[rows]) for s, e in zip(self.atr_state, self.atr_state_eps))
+            f['atr'] = ewm_value(state, self._tr(rows, eps), 1.0 / ATR_LENGTH, ATR_LENGTH)
+
+        ph, pl, pc = prev[:, 0], prev[:, 1], prev[:, 2]
+        p = (ph + pl + pc) / 3
+        f['p'], f['s1'], f['r1'] = p, (2 * p) - ph, (2 * p) - pl
+        f['s2'], f['r2'] = p - (ph - pl), p + (ph - pl)
+
+        max_h, min_l = np.maximum(self.fib_hi[rows], h), np.minimum(self.fib_lo[rows], l)
+        f['fib_618'], f['fib_500'] = max_h - ((max_h - min_l) * 0.618), max_h - ((max_h - min_l) * 0.5)
+        f['swing_high'], f['swing_low'] = max_h, min_l
+        f['max_vol_price'] = np.where(vol > self.vol_max[rows], c, self.vol_close[rows])
+        return f
+
+    def scores(self, rows=None, f=None):
+        with np.errstate(invalid='ignore'):
+            return score_features(self.features(rows) if f is None else f, self.rules)
+
+    def states(self, tickers=None):
+        # build_states 형태의 분석 상태. tickers 를 주면 그 티커만 (가격이 바뀐 종목만 재채점할 때)
+        tickers = self.tickers if tickers is None else [t for t in dict.fromkeys(tickers) if t in self.pos]
+        tracked = [t for t in tickers if self.ok[self.pos[t]]]
+        rows = np.zeros(len(self.tickers), dtype=bool)
+        rows[[self.pos[t] for t in tracked]] = True
+        # rows 는 패널 순서이므로 티커도 패널 순서로 맞춘다
+        tracked = [t for t, r in zip(self.tickers, rows) if r]
+        if tracked:
+            f = self.features(rows)
+            out = dict(zip(tracked, build_states(tracked, f, self.scores(rows, f), self.rules)))
+        else: out = {}
+        fallback = [t for t in tickers if t not in out]
+        if fallback:
+            out.update(zip(fallback, analyze_states(subset_panel(self.fallback_panel, fallback), rules=self.rules)))
+        return [out[t] for t in tickers]
@@ -0,0 +1,83 @@
+# KRX 종목코드 → 시장(.KS / .KQ) 테이블
+# 6자리 코드를 미리 올바른 접미사로 바꿔 한 번의 배치 다운로드에 넣는다. 로컬 캐시 후 주기적으로 갱신.
+import json
+import os
+import threading
+import time
+
+from metrics import record
+from names import KR_EXCHANGES, make_session
+from store import DATA_DIR
+
+LISTING_URL = "https://m.stock.naver.com/api/stocks/marketValue/{market}"
+LISTING_MARKETS = {'KOSPI': 'KS', 'KOSDAQ': 'KQ'}
+MAX_AGE = 7 * 86400
+
+def fetch_naver_listing(session, page_size=100):
+    # {코드: (접미사, 종목명)} - 시가총액 순 상장 목록을 페이지 단위로 끝까지 받는다
+    codes = {}
+    for market, suffix in LISTING_MARKETS.items():
+        page = 1
+        while True:
+            res = session.get(LISTING_URL.format(market=market), params={'page': page, 'pageSize': page_size}, timeout=5)
+            res.raise_for_status()
+            data = res.json()
+            stocks = data.get('stocks') or []
+            for s in stocks: codes[s['itemCode']] = (suffix, s.get('stockName'))
+            if not stocks or page * page_size >= data.get('totalCount', 0): break
+            page += 1
+    return codes
+
+class KrxCodeTable:
+    def __init__(self, path=None, fetch=fetch_naver_listing, max_age=MAX_AGE, session=None):
+        self.path = path or os.path.join(DATA_DIR, "krx_codes.json")
+        self.fetch = fetch
+        self.max_age = max_age
+        self.session = session
+        self._lock = threading.Lock()
+        self._codes, self._updated = None, 0
+
+    def _ensure(self):
+        with self._lock:
+            if self._codes is None:
+                try:
+                    with open(self.path, encoding='utf-8') as f: data = json.load(f)
+                    self._codes, self._updated = {c: tuple(v) for c, v in data['codes'].items()}, data['updated']
+                except (OSError, ValueError, KeyError): self._codes = {}
+        if time.time() - self._updated >= self.max_age: self.refresh()
+        return self._codes
+
+    def refresh(self):
+        # 실패하면 기존(오래된) 테이블을 그대로 쓴다. 다음 갱신 시도는 한 시간 뒤
+        try: codes = self.fetch(self.session or make_session())
+        except Exception: codes = None
+        with self._lock:
+            record('cache_miss' if codes else 'fallback')
+            if codes:
+                self._codes, self._updated = codes, time.time()
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                tmp = f"{self.path}.{os.getpid()}.tmp"
+                with open(tmp, 'w', encoding='utf-8') as f:
+                    json.dump({'updated': self._updated, 'codes': codes}, f, ensure_ascii=False)
+                os.replace(tmp, self.path)
+            else:
+                self._codes = self._codes or {}
+                self._updated = time.time() - self.max_age + 3600
+        return bool(codes)
+
+    def suffix(self, code):
+        entry = self._ensure().get(code)
+        return entry[0] if entry else None
+
+    def resolve(self, code):
+        # 테이블에 없는 코드(신규 상장 등)는 기존처럼 .KS 로 두고 스캔 단계의 .KQ 재시도에 맡긴다
+        return f"{code}.{self.suffix(code) or 'KS'}"
+
+    def universe(self, market=None):
+        # market: 'KOSPI' / 'KOSDAQ' / None(전체)
+        want = LISTING_MARKETS.get(market)
+        return [f"{c}.{sfx}" for c, (sfx, _) in self._ensure().items() if want in (None, sfx)]
+
+    def symbol_entries(self):
+        # SymbolDirectory.bulk_load 입력 {티커: (종목명, 거래소)}
+        return {f"{c}.{sfx}": (name, KR_EXCHANGES[sfx]) for c, (sfx, name) in self._ensure().items() if name}
@@ -0,0 +1,238 @@
+# 다중 시간대 지지/저항 레벨 인덱스
+# 티커마다 일봉/주봉/월봉 피벗, 주봉(26주)/월봉(12개월) 피보나치, 거래량 프로파일 상위 가격대, 이동평균선을
+# 확정 봉(마지막 봉 = 진행 중인 봉 제외)에서 한 번에 (티커축 벡터 연산으로) 계산해 들고 있다.
+# 확정 봉이 바뀐 티커만 다시 계산하므로 장중 체결가 갱신에는 다시 계산할 것이 없고, 새 봉이 붙은 티커만 갱신된다.
+# 모든 레벨은 (티커 순번, log 가격) 정렬 키 하나로 묶여 있어 "현재가 ±x% 안의 레벨" 을 전 종목에 대해
+# searchsorted 두 번으로 찾는다.
+#   index = LevelIndex(); index.update(panel); index.near({"NVDA": 120.5}, 0.02)
+# 규칙 세트에서는 analyze_states(..., levels=index) 로 넘기면 mtf_sup / mtf_res (밴드 안 아래/위 레벨 수) 와
+# vp_poc (거래량 프로파일 최대 구간 중심가) 특징을 쓸 수 있다 (예: rules.V14_3_MTF).
+import argparse
+import hashlib
+import sys
+
+import numpy as np
+import pandas as pd
+
+from engine import SMA_LENGTHS, subset_panel
+
+LEVEL_BAND = 0.02     # 기본 근접 밴드 (±2%)
+WEEKS, MONTHS = 26, 12  # 주봉/월봉 피보나치 구간 (완성된 주/월 수)
+FIB_RATIOS = (0.382, 0.5, 0.618)
+VP_PERIOD, VP_BINS, VP_NODES = 240, 24, 3  # 거래량 프로파일: 확정 봉 수, 가격 구간 수, 레벨로 쓸 상위 구간 수
+PIVOTS = ("P", "S1", "S2", "R1", "R2")
+LEVELS = (tuple(f"{tf}{p}" for tf in ("일봉", "주봉", "월봉") for p in PIVOTS)
+          + tuple(f"{tf}피보({r})" for tf in ("주봉", "월봉") for r in FIB_RATIOS)
+          + tuple(f"매물대{k + 1}" for k in range(VP_NODES))
+          + tuple(f"{n}일선" for n in SMA_LENGTHS))
+LEVEL_FEATURES = frozenset({'mtf_sup', 'mtf_res', 'vp_poc'})   # confluence() 가 특징에 더하는 이름
+_SPAN = 100.0   # 정렬 키의 티커 간격 (log 가격 + _SHIFT 가 이 안에 들어간다)
+_SHIFT = 50.0
+
+# --- 1. 레벨 계산 (티커축 벡터화) ---
+def _pivots(h, l, c):
+    p = (h + l + c) / 3
+    return [p, (2 * p) - h, p - (h - l), (2 * p) - l, p + (h - l)]
+
+def _last_of(mask, x):
+    # 티커마다 mask 가 참인 마지막 위치의 x (없으면 NaN)
+    idx = mask.shape[1] - 1 - np.argmax(mask[:, ::-1], axis=1)
+    return np.where(mask.any(axis=1), x[np.arange(len(x)), idx], np.nan)
+
+def _range(mask, high, low):
+    return np.where(mask, high, -np.inf).max(axis=1), np.where(mask, low, np.inf).min(axis=1)
+
+def _period_pivots(period, conf, cur, high, low, close):
+    # 현재 봉이 속한 기간 직전의 완성된 기간 (주/월) 하나로 만든 피벗
+    before = conf & (period < cur[:, None])
+    prev = np.where(before, period, np.iinfo(np.int64).min).max(axis=1)
+    m = before & (period == prev[:, None])
+    h, l = _range(m, high, low)
+    return _pivots(h, l, _last_of(m, close))
+
+def _period_fib(period, conf, cur, n, high, low):
+    m = conf & (period < cur[:, None]) & (period >= (cur - n)[:, None])
+    hi, lo = _range(m, high, low)
+    return [hi - (hi - lo) * r for r in FIB_RATIOS]
+
+def _volume_profile(win, high, low, close, volume):
+    # 확정 봉 VP_PERIOD 개의 (고가, 저가) 범위를 VP_BINS 구간으로 나눠 대표가 ((H+L+C)/3) 별로 거래량을 쌓는다 → 상위 구간 중심가
+    N = len(high)
+    hi, lo = _range(win, high, low)
+    width = (hi - lo) / VP_BINS
+    typical = (high + low + close) / 3
+    with np.errstate(invalid='ignore', divide='ignore'):
+        b = np.clip(np.floor((typical - lo[:, None]) / width[:, None]), 0, VP_BINS - 1)
+    ok = win & np.isfinite(b) & (width > 0)[:, None] & ~np.isnan(volume)
+    hist = np.zeros(N * VP_BINS)
+    rows = np.broadcast_to(np.arange(N)[:, None], ok.shape)
+    np.add.at(hist, rows[ok] * VP_BINS + b[ok].astype(np.int64), volume[ok])
+    hist = hist.reshape(N, VP_BINS)
+    top = np.argsort(-hist, axis=1, kind='stable')[:, :VP_NODES]
+    centers = lo[:, None] + (top + 0.5) * width[:, None]
+    return list(np.where(np.take_along_axis(hist, top, axis=1) > 0, centers, np.nan).T)
+
+def compute_levels(panel):
+    # → (N, len(LEVELS)) 레벨 가격. 계산할 수 없는 레벨은 NaN
+    with np.errstate(invalid='ignore'): return _compute_levels(panel)
+
+def _compute_levels(panel):
+    v, dates = panel['values'], panel['dates']
+    N, T = dates.shape
+    if not T: return np.full((N, len(LEVELS)), np.nan)
+    high, low, close, volume = v[:, :, 1], v[:, :, 2], v[:, :, 3], v[:, :, 4]
+    valid = ~np.isnan(close)
+    rank = np.cumsum(valid, axis=1)
+    n_valid = rank[:, -1]
+    conf = valid & (rank < n_valid[:, None])            # 확정 봉 (마지막 유효 봉 제외)
+    current = valid & (rank == n_valid[:, None])
+
+    day = dates.astype('datetime64[D]').astype(np.int64)
+    week = (day + 3) // 7                                # 월요일 시작 주 (1970-01-01 은 목요일)
+    month = dates.astype('datetime64[M]').astype(np.int64)
+    cur_week, cur_month = _last_of(current, week), _last_of(current, month)
+    cur_week = np.nan_to_num(cur_week, nan=-1).astype(np.int64)
+    cur_month = np.nan_to_num(cur_month, nan=-1).astype(np.int64)
+
+    last = conf & (rank == (n_valid - 1)[:, None])
+    cols = _pivots(_last_of(last, high), _last_of(last, low), _last_of(last, close))
+    cols += _period_pivots(week, conf, cur_week, high, low, close)
+    cols += _period_pivots(month, conf, cur_month, high, low, close)
+    cols += _period_fib(week, conf, cur_week, WEEKS, high, low)
+    cols += _period_fib(month, conf, cur_month, MONTHS, high, low)
+    cols += _volume_profile(conf & (rank >= (n_valid - VP_PERIOD)[:, None]), high, low, close, volume)
+    for n in SMA_LENGTHS:
+        m = conf & (rank >= (n_valid - n)[:, None])
+        cols.append(np.where(m.sum(axis=1) == n, np.where(m, close, 0.0).sum(axis=1) / n, np.nan))
+    out = np.stack(cols, axis=1)
+    return np.where(np.isfinite(out) & (out > 0), out, np.nan)
+
+def level_keys(panel):
+    # 확정 봉 이력 digest - 장중 체결가 (마지막 봉) 변화에는 같고, 새 봉이 붙거나 과거 봉이 수정되면 바뀐다
+    keys = []
+    for i in range(len(panel['tickers'])):
+        n = panel['length'][i]
+        row = panel['values'][i, -n:-1] if n > 1 else panel['values'][i, :0]
+        keys.append(hashlib.blake2b(row.tobytes(), digest_size=8).hexdigest())
+    return keys
+
+# --- 2. 인덱스 ---
+class LevelIndex:
+    """티커별 레벨 행렬 + 전 종목 범위 조회용 정렬 키. band 는 confluence() 의 기본 밴드."""
+
+    def __init__(self, band=LEVEL_BAND):
+        self.band = band
+        self.tickers = []
+        self.levels = np.empty((0, len(LEVELS)))
+        self._pos, self._keys = {}, {}
+        self._sorted = None
+
+    def __len__(self):
+        return len(self.tickers)
+
+    def __contains__(self, ticker):
+        return ticker in self._pos
+
+    def update(self, panel):
+        # 확정 봉이 바뀐 (또는 새) 티커만 다시 계산한다 → 다시 계산한 티커
+        keys = dict(zip(panel['tickers'], level_keys(panel)))
+        changed = [t for t, k in keys.items() if self._keys.get(t) != k]
+        if not changed: return []
+        fresh = compute_levels(subset_panel(panel, changed))
+        new = [t for t in changed if t not in self._pos]
+        if new:
+            self._pos.update({t: len(self.tickers) + k for k, t in enumerate(new)})
+            self.tickers += new
+            self.levels = np.concatenate([self.levels, np.full((len(new), len(LEVELS)), np.nan)])
+        self.levels[[self._pos[t] for t in changed]] = fresh
+        self._keys.update({t: keys[t] for t in changed})
+        self._sorted = None
+        return changed
+
+    def get(self, ticker):
+        # → {레벨 이름: 가격} (계산된 레벨만)
+        if ticker not in self._pos: return {}
+        row = self.levels[self._pos[ticker]]
+        return {name: float(p) for name, p in zip(LEVELS, row) if not np.isnan(p)}
+
+    def _search(self):
+        # (티커 순번 × _SPAN + log 가격) 으로 정렬한 레벨 목록. 갱신 뒤 첫 조회 때 한 번 만든다
+        if self._sorted is None:
+            ii, kk = np.nonzero(~np.isnan(self.levels))
+            price = self.levels[ii, kk]
+            keys = ii * _SPAN + _SHIFT + np.log(price)
+            order = np.argsort(keys, kind='stable')
+            self._sorted = keys[order], ii[order], kk[order], price[order]
+        return self._sorted
+
+    def _bounds(self, tickers, prices, lo, hi):
+        # → (조회 가능한 행, 티커 순번, 구간 시작, 구간 끝)
+        idx = np.array([self._pos.get(t, -1) for t in tickers], dtype=np.int64)
+        prices = np.asarray(prices, dtype=float)
+        ok = (idx >= 0) & (prices > 0)
+        keys = self._search()[0]
+        base = idx[ok] * _SPAN + _SHIFT + np.log(prices[ok])
+        return ok, idx[ok], np.searchsorted(keys, base + np.log1p(-lo), 'left'), np.searchsorted(keys, base + np.log1p(hi), 'right')
+
+    def near(self, prices, band=None):
+        # prices: {티커: 가격} → 밴드 (±band) 안 레벨 전부 (티커, 레벨, 가격, 거리(%)), 티커 안에서는 가격순
+        band = self.band if band is None else band
+        tickers, values = list(prices), list(prices.values())
+        ok, idx, a, b = self._bounds(tickers, values, band, band)
+        counts = b - a
+        owner = np.repeat(np.arange(len(idx)), counts)
+        pos = a[owner] + np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        _, _, kind, price = self._search()
+        ref = np.asarray(values, dtype=float)[ok][owner]
+        return pd.DataFrame({'티커': np.asarray(tickers, dtype=object)[ok][owner], '레벨': np.asarray(LEVELS, dtype=object)[kind[pos]],
+                             '가격': price[pos], '거리(%)': (price[pos] / ref - 1) * 100})
+
+    def confluence(self, tickers, close, band=None):
+        # → {'mtf_sup': 가격 이하 밴드 안 레벨 수, 'mtf_res': 가격 초과 밴드 안 레벨 수, 'vp_poc': 매물대1 가격}
+        # (티커 순서 배열, 인덱스에 없으면 0)
+        band = self.band if band is None else band
+        ok, idx, a, b = self._bounds(tickers, close, band, band)
+        mid = np.searchsorted(self._search()[0], idx * _SPAN + _SHIFT + np.log(np.asarray(close, dtype=float)[ok]), 'right')
+        sup, res = np.zeros(len(ok), dtype=np.int64), np.zeros(len(ok), dtype=np.int64)
+        sup[ok], res[ok] = mid - a, b - mid
+        poc = np.zeros(len(ok))
+        poc[ok] = np.nan_to_num(self.levels[idx, LEVELS.index("매물대1")])
+        return {'mtf_sup': sup, 'mtf_res': res, 'vp_poc': poc}
+
+# --- 3. CLI ---
+def main(argv=None):
+    from scan import MARKETS, load_panel, normalize_tickers, read_ticker_file
+    from store import BarStore
+    from krx import KrxCodeTable
+    from engine import KOREA
+
+    parser = argparse.ArgumentParser(description="Quant Screener multi-timeframe levels")
+    parser.add_argument('tickers', nargs='*', help="티커 (쉼표/공백 구분)")
+    parser.add_argument('--file', action='append', default=[], help="티커 목록 파일 (여러 번 지정 가능)")
+    parser.add_argument('--market', choices=MARKETS, default='us')
+    parser.add_argument('--period', default='2y', help="월봉 피보나치(12개월)를 채우려면 1년 이상")
+    parser.add_argument('--band', type=float, default=LEVEL_BAND * 100, help="현재가 ± 밴드 (%%)")
+    parser.add_argument('--data-dir', help="일봉 저장소 경로")
+    parser.add_argument('--out', help="근접 레벨 저장 경로 (.csv 또는 .parquet)")
+    args = parser.parse_intermixed_args(argv)
+
+    market = MARKETS[args.market]
+    krx = KrxCodeTable() if market == KOREA else None
+    raw = [t for arg in args.tickers for t in arg.split(',')] + [t for path in args.file for t in read_ticker_file(path)]
+    tickers = list(dict.fromkeys(normalize_tickers(raw, market, krx)))
+    if not tickers: parser.error("분석할 종목을 입력해주세요.")
+
+    panel, order, errors = load_panel(tickers, BarStore(args.data_dir), period=args.period)
+    index = LevelIndex(args.band / 100)
+    index.update(panel)
+    close = {t: panel['values'][i, -1, 3] for i, t in enumerate(panel['tickers'])}
+    near = index.near(close)
+    if args.out:
+        from scan import write_table
+        write_table(near, args.out)
+    else: print(near.to_string(index=False, float_format=lambda x: f"{x:,.2f}"))
+    print(f"레벨 {np.isfinite(index.levels).sum()}개 / {len(index)}종목, 밴드 안 {len(near)}개, 실패 {len(errors)}건", file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,125 @@
+# 실행 계측 (단계 / 티커별 시간 · 요청 수 · 바이트 · 재시도 · 폴백 · 캐시 적중 · 메모리)
+# 호출 측이 Trace 를 켜 두면 (with tracing(Trace()): ...) 각 모듈이 record() 로 이벤트를 남긴다. 꺼져 있으면 아무 일도 하지 않는다.
+# 스레드 풀 작업은 submit() 으로 넘겨야 현재 Trace / 단계가 작업 스레드까지 따라간다.
+import contextlib
+import contextvars
+import json
+import os
+import threading
+import time
+import tracemalloc
+import uuid
+
+import pandas as pd
+
+# bytes 는 requests 세션 훅으로 잰 HTTP 응답 크기뿐이다 (종목명 / KRX / 관심종목). yfinance 는 내부 세션이라 응답을 잴 수 없어
+# Yahoo 일봉 · 1분봉은 받은 표의 메모리 크기만 frame_bytes 로 따로 남는다
+BYTES_NOTE = ("bytes 는 직접 잰 HTTP 응답 크기(종목명 · KRX · 관심종목)뿐입니다. Yahoo 일봉 · 1분봉은 yfinance 내부 요청이라 "
+              "응답 크기를 잴 수 없어 받은 표의 메모리 크기를 frame_bytes 로 따로 보여줍니다.")
+KINDS = ('wall', 'request', 'bytes', 'frame_bytes', 'retry', 'fallback', 'cache_hit', 'cache_miss', 'peak_mb', 'rss_mb', 'rss_delta_mb',
+         'latency')
+_trace = contextvars.ContextVar('trace', default=None)
+_stage = contextvars.ContextVar('stage', default=None)
+
+def _rss_mb():
+    # 지금의 RSS (Linux /proc). 다른 OS 에서는 None
+    try:
+        with open('/proc/self/statm') as f: return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2**20
+    except (OSError, ValueError, AttributeError): return None
+
+class Trace:
+    # memory=True 면 단계마다 tracemalloc 으로 파이썬 할당 최대치(peak_mb)를 잰다 (느려진다).
+    # 아니면 단계 끝의 RSS(rss_mb)와 단계 동안의 RSS 변화(rss_delta_mb)만 남긴다 - 프로세스 평생 최대치는 쓰지 않는다
+    def __init__(self, memory=False):
+        self.run_id = uuid.uuid4().hex[:8]
+        self.started = time.time()
+        self.memory = memory
+        self.events = []
+        self._lock = threading.Lock()
+
+    def record(self, kind, value=1, ticker=None, stage=None):
+        event = {'run': self.run_id, 'stage': stage or _stage.get(), 'ticker': ticker, 'kind': kind,
+                 'value': value, 't': round(time.time() - self.started, 6)}
+        with self._lock: self.events.append(event)
+
+    def extend(self, events):
+        # 다른 프로세스(청크)에서 모은 이벤트 합치기
+        with self._lock: self.events += [{**e, 'run': self.run_id} for e in events]
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        token = _stage.set(name)
+        if self.memory:
+            if not tracemalloc.is_tracing(): tracemalloc.start()
+            tracemalloc.reset_peak()
+        rss = None if self.memory else _rss_mb()
+        start = time.perf_counter()
+        try: yield self
+        finally:
+            self.record('wall', time.perf_counter() - start, stage=name)
+            if self.memory and tracemalloc.is_tracing(): self.record('peak_mb', tracemalloc.get_traced_memory()[1] / 2**20, stage=name)
+            elif rss is not None:
+                end = _rss_mb()
+                self.record('rss_mb', end, stage=name)
+                self.record('rss_delta_mb', end - rss, stage=name)
+            _stage.reset(token)
+
+    def to_frame(self):
+        with self._lock: return pd.DataFrame(self.events, columns=['run', 'stage', 'ticker', 'kind', 'value', 't'])
+
+    def summary(self):
+        # 단계별 합계 (peak_mb / rss_mb 는 최대, latency 는 티커별 분포의 p50/p95/최대)
+        df = self.to_frame()
+        if df.empty: return pd.DataFrame()
+        df['stage'] = df['stage'].fillna('-')
+        totals = df[~df['kind'].isin(['peak_mb', 'rss_mb', 'latency'])].pivot_table(index='stage', columns='kind', values='value', aggfunc='sum')
+        peaks = df[df['kind'].isin(['peak_mb', 'rss_mb'])].pivot_table(index='stage', columns='kind', values='value', aggfunc='max')
+        lat = df[df['kind'] == 'latency'].groupby('stage')['value']
+        out = totals.join(peaks, how='outer').join(pd.DataFrame({
+            'latency_p50': lat.quantile(0.5), 'latency_p95': lat.quantile(0.95), 'latency_max': lat.max()}), how='outer')
+        out = out.reindex(columns=[c for c in ('wall', 'request', 'bytes', 'frame_bytes', 'retry', 'fallback', 'cache_hit', 'cache_miss',
+                                               'peak_mb', 'rss_mb', 'rss_delta_mb', 'latency_p50', 'latency_p95', 'latency_max')
+                                   if c in out.columns])
+        order = list(dict.fromkeys(df['stage']))
+        return out.reindex(order).fillna(0)
+
+    def to_json(self):
+        return json.dumps({'run': self.run_id, 'started': self.started, 'events': self.to_frame().to_dict('records')},
+                          ensure_ascii=False, default=str)
+
+    def to_csv(self):
+        return self.to_frame().to_csv(index=False)
+
+    def export(self, path):
+        with open(path, 'w', encoding='utf-8') as f: f.write(self.to_json() if path.endswith('.json') else self.to_csv())
+
+@contextlib.contextmanager
+def tracing(trace):
+    # memory Trace 면 이 블록 동안만 tracemalloc 을 켠다 (끝나면 꺼서 이후 실행이 느려지지 않게)
+    token = _trace.set(trace)
+    started = trace is not None and trace.memory and not tracemalloc.is_tracing()
+    if started: tracemalloc.start()
+    try: yield trace
+    finally:
+        if started: tracemalloc.stop()
+        _trace.reset(token)
+
+def current():
+    return _trace.get()
+
+def record(kind, value=1, ticker=None):
+    trace = _trace.get()
+    if trace is not None: trace.record(kind, value, ticker)
+
+def stage(name):
+    trace = _trace.get()
+    return trace.stage(name) if trace is not None else contextlib.nullcontext()
+
+def submit(pool, fn, *args, **kwargs):
+    # 현재 Trace / 단계를 작업 스레드로 넘긴다 (작업마다 컨텍스트 복사본 하나)
+    return pool.submit(contextvars.copy_context().run, fn, *args, **kwargs)
+
+def count_response(res, *args, **kwargs):
+    # requests 세션 응답 훅: 요청 수 + 응답 바이트
+    record('request')
+    record('bytes', len(res.content or b""))
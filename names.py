@@ -0,0 +1,117 @@
+# 종목명 디렉터리 (티커 → 종목명 / 거래소)
+# 로컬 인덱스 파일을 먼저 보고, 없는 티커만 공유 세션 + 스레드 풀로 한 번에 조회해 저장한다.
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+import yfinance as yf
+
+from metrics import count_response, record, submit
+from store import DATA_DIR
+
+HEADERS = {'User-Agent': 'Mozilla/5.0'}
+NAVER_URL = "https://m.stock.naver.com/api/stock/{code}/integration"
+YAHOO_SEARCH_URL = "https://query2.finance.yahoo.com/v1/finance/search"
+KR_EXCHANGES = {'KS': 'KOSPI', 'KQ': 'KOSDAQ'}
+RETRY_AFTER = 86400  # 조회 실패한 티커는 하루 뒤에 다시 묻는다
+
+def make_session(pool_size=8):
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('https://', adapter)
+    session.headers.update(HEADERS)
+    session.hooks['response'].append(count_response)
+    return session
+
+def lookup_kr(ticker, session):
+    code, suffix = ticker.split('.')
+    res = session.get(NAVER_URL.format(code=code), timeout=2)
+    if res.status_code != 200: return None
+    return {'name': res.json().get('stockName'), 'exchange': KR_EXCHANGES.get(suffix)}
+
+def lookup_us(ticker, session):
+    # 검색 API 는 .info (펀더멘탈 전체) 보다 훨씬 가볍다. 정확히 일치하는 심볼이 없을 때만 .info 로 넘어간다
+    res = session.get(YAHOO_SEARCH_URL, params={'q': ticker, 'quotesCount': 5, 'newsCount': 0}, timeout=3)
+    if res.status_code == 200:
+        for q in res.json().get('quotes', []):
+            if q.get('symbol', '').upper() == ticker:
+                return {'name': q.get('shortname') or q.get('longname'), 'exchange': q.get('exchDisp') or q.get('exchange')}
+    record('fallback', ticker=ticker)
+    record('request', ticker=ticker)
+    info = yf.Ticker(ticker).info
+    return {'name': info.get('shortName') or info.get('longName'), 'exchange': info.get('exchange')}
+
+def lookup(ticker, session):
+    if ticker.endswith('.KS') or ticker.endswith('.KQ'): return lookup_kr(ticker, session)
+    return lookup_us(ticker, session)
+
+class SymbolDirectory:
+    def __init__(self, path=None, max_workers=8, session=None, lookup=lookup):
+        self.path = path or os.path.join(DATA_DIR, "symbols.json")
+        self.max_workers = max_workers
+        self.session = session or make_session(max_workers)
+        self.lookup = lookup
+        self._lock = threading.Lock()
+        self._index = self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, encoding='utf-8') as f: return json.load(f)
+        except (OSError, ValueError): return {}
+
+    def save(self, tickers=None):
+        # 다른 프로세스가 쓴 항목을 지우지 않도록 다시 읽어 병합한다
+        with self._lock:
+            disk = self._load()
+            disk.update(self._index if tickers is None else {t: self._index[t] for t in tickers if t in self._index})
+            self._index = {**disk, **self._index}
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp, 'w', encoding='utf-8') as f: json.dump(disk, f, ensure_ascii=False)
+            os.replace(tmp, self.path)
+
+    def __contains__(self, ticker):
+        return bool(self._index.get(ticker, {}).get('name'))
+
+    def get(self, ticker):
+        entry = self._index.get(ticker)
+        return entry.get('name') or ticker if entry else ticker
+
+    def exchange(self, ticker):
+        return (self._index.get(ticker) or {}).get('exchange')
+
+    def bulk_load(self, entries, persist=True):
+        # entries: {티커: (종목명, 거래소)} - 상장 목록 등에서 한 번에 채운다
+        now = time.time()
+        with self._lock:
+            for t, (name, exchange) in entries.items():
+                self._index[t] = {'name': name, 'exchange': exchange, 'ts': now}
+        if persist: self.save(list(entries))
+
+    def misses(self, tickers):
+        now = time.time()
+        return [t for t in dict.fromkeys(tickers)
+                if t not in self and now - self._index.get(t, {}).get('ts', 0) >= RETRY_AFTER]
+
+    def resolve(self, tickers):
+        # 인덱스에 없는 티커만 동시에 조회 → 저장. 따뜻한 실행에서는 네트워크 없이 끝난다
+        todo = self.misses(tickers)
+        record('cache_hit', len(set(tickers)) - len(todo))
+        if todo:
+            record('cache_miss', len(todo))
+            def fetch(t):
+                start = time.perf_counter()
+                try: return t, self.lookup(t, self.session)
+                except Exception: return t, None
+                finally: record('latency', time.perf_counter() - start, ticker=t)
+            now = time.time()
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(todo))) as pool:
+                found = [f.result() for f in [submit(pool, fetch, t) for t in todo]]
+            with self._lock:
+                for t, entry in found:
+                    self._index[t] = {'name': (entry or {}).get('name'), 'exchange': (entry or {}).get('exchange'), 'ts': now}
+            self.save(todo)
+        return {t: self.get(t) for t in tickers}
@@ -0,0 +1,66 @@
+# 실시간 체결가 스냅샷 (장전/정규장/장후 포함 마지막 체결)
+# 티커별 1분봉 조회를 스레드 풀로 동시에 보내고, 마지막 봉 하나만 남긴다.
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import time as dtime
+import time
+import yfinance as yf
+
+from metrics import record, submit
+
+# 거래소 시간대 / 정규장 (시작, 종료)
+MARKET_HOURS = {
+    'KR': ('Asia/Seoul', dtime(9, 0), dtime(15, 30)),
+    'US': ('America/New_York', dtime(9, 30), dtime(16, 0)),
+}
+WINDOWS = ("1d", "5d")  # 짧은 구간부터, 비어 있으면 (주말/휴장) 한 단계 넓힌다
+
+def market_of(ticker):
+    return 'KR' if ticker.endswith('.KS') or ticker.endswith('.KQ') else 'US'
+
+def classify_session(ticker, ts):
+    tz, open_t, close_t = MARKET_HOURS[market_of(ticker)]
+    local = ts.tz_convert(tz) if ts.tzinfo else ts
+    t = local.time()
+    if t < open_t: return 'pre'
+    if t >= close_t: return 'post'
+    return 'regular'
+
+def yahoo_history(ticker, period, session=None):
+    # yfinance 는 내부 공유 세션(커넥션 풀)을 쓴다. 별도 세션을 넘기면 그것을 재사용한다
+    kwargs = {'session': session} if session is not None else {}
+    return yf.Ticker(ticker, **kwargs).history(period=period, interval="1m", prepost=True)
+
+def fetch_snapshot(ticker, history=yahoo_history, **kwargs):
+    start = time.perf_counter()
+    try:
+        for i, period in enumerate(WINDOWS):
+            if i: record('retry', ticker=ticker)
+            record('request', ticker=ticker)
+            df = history(ticker, period, **kwargs)
+            if df is not None and not df.empty:
+                # yfinance 내부 HTTP 응답은 잴 수 없다 - 네트워크 bytes 와 섞이지 않게 받은 표의 메모리 크기만 따로 남긴다
+                record('frame_bytes', int(df.memory_usage(index=True).sum()), ticker=ticker)
+                last = df.iloc[-1]
+                return {'price': last['Close'], 'time': last.name, 'session': classify_session(ticker, last.name)}
+        return None
+    finally: record('latency', time.perf_counter() - start, ticker=ticker)
+
+def fetch_snapshots(tickers, max_workers=8, history=yahoo_history, on_done=None, **kwargs):
+    # {티커: {'price', 'time', 'session'}} - 실패/빈 응답 티커는 빠진다. on_done 은 호출한 스레드에서 불린다
+    tickers = list(dict.fromkeys(tickers))
+    snapshots = {}
+    if not tickers: return snapshots
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(tickers))) as pool:
+        futures = {submit(pool, fetch_snapshot, t, history, **kwargs): t for t in tickers}
+        for i, fut in enumerate(as_completed(futures)):
+            ticker = futures[fut]
+            try:
+                snap = fut.result()
+                if snap is not None: snapshots[ticker] = snap
+            except Exception: pass
+            if on_done: on_done(i + 1, len(tickers), ticker)
+    return snapshots
+
+def as_ticks(snapshots):
+    # inject_ticks 입력 형태 {티커: (가격, 체결시각)}
+    return {t: (s['price'], s['time']) for t, s in snapshots.items()}
@@ -0,0 +1,214 @@
+# 선언형 스크리닝 규칙 (지지/저항 · 가중치 · 임계값 · 등급)
+# 규칙 세트는 JSON 으로 저장할 수 있는 dict 하나다. compile_rules() 가 식 문자열을 한 번만 파싱·검증해 코드 객체로 바꾸고,
+# RuleSet.evaluate() 가 최신 봉 특징 (티커축 배열 dict) 전체에 한 번에 적용한다. 특징은 규칙 세트와 무관하므로
+# 같은 특징으로 여러 규칙 세트를 돌려도 지표는 다시 계산하지 않는다.
+#
+# 식 문법: 특징 이름 (close, rsi, sma200, p, s1, ...) 과 숫자, 산술 (+ - * /), 비교 (a < b < c 가능),
+# and / or / not, abs · min · max. and/or/not 은 배열 원소별 &, |, ~ 로 바뀐다.
+# 평가 순서 (앞 단계 이름을 뒤에서 쓸 수 있다):
+#   특징 → supports/resistances (hit_sup, hit_res, n_sup, n_res) → define (순서대로) → buy_score/sell_score (buy, sell) → tiers
+import ast
+import hashlib
+import json
+
+import numpy as np
+
+FUNCTIONS = {'abs': np.abs, 'min': np.minimum, 'max': np.maximum}
+
+V14_3 = {
+    'name': 'v14.3',
+    # 이름 → 레벨 식. 종가가 레벨 × [하한, 상한] 안이면 지지 근접, 레벨 × 비율 이상이면 저항 도달 (레벨 ≤ 0 은 무시)
+    'supports': {'볼린저하단': 'bbl', '피벗S1': 's1', '피보나치(0.618)': 'fib_618', '60일선': 'sma60',
+                 '120일선': 'sma120', '최대매물대': 'max_vol_price'},
+    'support_band': [0.975, 1.025],
+    'resistances': {'볼린저상단': 'bbu', '피벗R1': 'r1', '피벗R2': 'r2', '전고점': 'swing_high'},
+    'resistance_band': 0.98,
+    'define': {'up': 'close > sma200', 'buy_zone': 'rsi < 60'},
+    # [식, 가중치] - 점수 = Σ 식 × 가중치 (참/거짓은 1/0)
+    'buy_score': [['close > p', 0.5], ['n_sup', 1.5], ['rsi < 35', 2.0], ['35 <= rsi < 50 and up', 1.0]],
+    'sell_score': [['n_res', 1.5], ['rsi > 70', 2.0], ['65 < rsi <= 70', 1.0]],
+    # 위에서부터 처음 맞는 등급 (코드 = 순번 + 1). side 가 buy 면 지지 근거, sell 이면 저항 근거를 붙인다
+    'tiers': [
+        {'label': "💎 인생 매수", 'color': 'purple', 'side': 'buy', 'when': 'buy_zone and (buy >= 5 or (up and n_sup >= 3))'},
+        {'label': "🔥 강력 매수", 'color': 'red', 'side': 'buy', 'when': 'buy_zone and (buy >= 3.5 or (up and n_sup >= 2))'},
+        {'label': "✅ 매수 고려", 'color': 'orange', 'side': 'buy', 'when': 'buy_zone and up and rsi < 55 and (buy >= 2 or n_sup >= 1)'},
+        {'label': "🚨 이익 실현", 'color': 'blue', 'side': 'sell', 'when': 'sell >= 3 or (n_res >= 1 and rsi > 70)'},
+        {'label': "📉 분할 매도", 'color': 'skyblue', 'side': 'sell', 'when': 'sell >= 1.5'},
+        {'label': "⚠️ 기술적 반등", 'color': 'gray', 'side': 'buy', 'when': 'not up and buy >= 3'},
+    ],
+    'neutral': {'label': "관망", 'color': 'black'},
+    # 지지/저항 이름 뒤에 붙는 추가 근거 - [식, 서식] (서식에는 특징 값을 {rsi:.1f} 처럼 쓴다)
+    'reasons': {'buy': [['rsi < 35', "RSI과매도({rsi:.1f})"]], 'sell': [['rsi > 70', "RSI과매수({rsi:.1f})"]]},
+    # 추세 열 (참이면 "상승")
+    'trend': 'up',
+}
+
+# v14.3 + 다중 시간대 레벨 (levels.LevelIndex 를 넘겨야 쓸 수 있다). 최대매물대 (최대 거래량 봉 종가 하나) 대신
+# 거래량 프로파일 최대 구간 중심가를 지지선으로 쓰고, 밴드 안 일/주/월봉 레벨이 3개 이상 겹치면 점수를 더한다
+V14_3_MTF = {
+    **V14_3,
+    'name': 'v14.3-mtf',
+    'supports': {**{k: v for k, v in V14_3['supports'].items() if k != '최대매물대'}, '매물대(프로파일)': 'vp_poc'},
+    'buy_score': V14_3['buy_score'] + [['mtf_sup >= 3', 1.0]],
+    'sell_score': V14_3['sell_score'] + [['mtf_res >= 3', 1.0]],
+    'reasons': {'buy': V14_3['reasons']['buy'] + [['mtf_sup >= 3', "레벨중첩({mtf_sup:.0f})"]],
+                'sell': V14_3['reasons']['sell'] + [['mtf_res >= 3', "레벨중첩({mtf_res:.0f})"]]},
+}
+PRESETS = {spec['name']: spec for spec in (V14_3, V14_3_MTF)}
+
+# --- 1. 식 컴파일 ---
+class _Vectorize(ast.NodeTransformer):
+    # and/or/not → & | ~, 연쇄 비교 → 비교끼리 &
+    def visit_BoolOp(self, node):
+        self.generic_visit(node)
+        op = ast.BitAnd() if isinstance(node.op, ast.And) else ast.BitOr()
+        out = node.values[0]
+        for value in node.values[1:]: out = ast.BinOp(out, op, value)
+        return out
+
+    def visit_UnaryOp(self, node):
+        self.generic_visit(node)
+        return ast.UnaryOp(ast.Invert(), node.operand) if isinstance(node.op, ast.Not) else node
+
+    def visit_Compare(self, node):
+        self.generic_visit(node)
+        left, parts = node.left, []
+        for op, right in zip(node.ops, node.comparators):
+            parts.append(ast.Compare(left, [op], [right]))
+            left = right
+        out = parts[0]
+        for part in parts[1:]: out = ast.BinOp(out, ast.BitAnd(), part)
+        return out
+
+_ALLOWED = (ast.Expression, ast.BinOp, ast.UnaryOp, ast.Compare, ast.Name, ast.Load, ast.Constant, ast.Call,
+            ast.Add, ast.Sub, ast.Mult, ast.Div, ast.USub, ast.UAdd, ast.Invert, ast.BitAnd, ast.BitOr,
+            ast.Lt, ast.LtE, ast.Gt, ast.GtE, ast.Eq, ast.NotEq)
+
+class Expr:
+    """식 문자열 하나를 컴파일한 것. names 는 식이 읽는 특징/중간값 이름."""
+
+    def __init__(self, source):
+        self.source = str(source)
+        try: tree = ast.parse(self.source.strip(), mode='eval')
+        except SyntaxError as e: raise ValueError(f"규칙 식 문법 오류: {self.source!r} ({e.msg})") from None
+        tree = ast.fix_missing_locations(_Vectorize().visit(tree))
+        names = set()
+        for node in ast.walk(tree):
+            if not isinstance(node, (*_ALLOWED, ast.BoolOp, ast.And, ast.Or, ast.Not)):
+                raise ValueError(f"규칙 식에 쓸 수 없는 구문: {self.source!r} ({type(node).__name__})")
+            if isinstance(node, ast.Constant) and not isinstance(node.value, (int, float, bool)):
+                raise ValueError(f"규칙 식에는 숫자 상수만 쓸 수 있다: {self.source!r}")
+            if isinstance(node, ast.Call) and (node.keywords or not isinstance(node.func, ast.Name) or node.func.id not in FUNCTIONS):
+                raise ValueError(f"규칙 식에서 부를 수 있는 함수는 {', '.join(FUNCTIONS)} 뿐이다: {self.source!r}")
+            if isinstance(node, ast.Name) and node.id not in FUNCTIONS: names.add(node.id)
+        self.names = frozenset(names)
+        self.code = compile(tree, f"<rule {self.source}>", 'eval')
+
+    def __call__(self, scope, n):
+        # → (n,) 배열. 상수 식도 티커 수만큼 펼친다
+        return np.broadcast_to(eval(self.code, {'__builtins__': {}, **FUNCTIONS}, scope), (n,))
+
+# --- 2. 규칙 세트 ---
+class RuleSet:
+    """컴파일된 규칙 세트. signals[code] = (신호, 색상), code 0 은 중립. names 는 식들이 읽는 이름 전체."""
+
+    def __init__(self, spec):
+        self.spec = spec
+        self.name = spec.get('name') or 'rules'
+        self.key = (self.name, hashlib.blake2b(json.dumps(spec, sort_keys=True, ensure_ascii=False).encode(), digest_size=8).hexdigest())
+        self.support_names, self.supports = self._levels('supports')
+        self.resistance_names, self.resistances = self._levels('resistances')
+        self.support_band = tuple(spec.get('support_band', (1.0, 1.0)))
+        self.resistance_band = float(spec.get('resistance_band', 1.0))
+        self.define = [(name, Expr(src)) for name, src in spec.get('define', {}).items()]
+        self.buy_terms = [(Expr(src), float(w)) for src, w in spec.get('buy_score', [])]
+        self.sell_terms = [(Expr(src), float(w)) for src, w in spec.get('sell_score', [])]
+        tiers = spec.get('tiers', [])
+        if not tiers: raise ValueError(f"규칙 세트 {self.name}: tiers 가 비어 있다")
+        for tier in tiers:
+            if tier.get('side') not in ('buy', 'sell'): raise ValueError(f"규칙 세트 {self.name}: side 는 buy/sell ({tier.get('label')})")
+        self.tiers = [Expr(tier['when']) for tier in tiers]
+        neutral = spec.get('neutral', {})
+        self.signals = ((neutral.get('label', "관망"), neutral.get('color', 'black')),) + tuple((t['label'], t.get('color', 'black')) for t in tiers)
+        self.buy_codes = tuple(i + 1 for i, t in enumerate(tiers) if t['side'] == 'buy')
+        self.sell_codes = tuple(i + 1 for i, t in enumerate(tiers) if t['side'] == 'sell')
+        # 결과표 정렬: 매수 등급 → 매도 등급 → 중립 (각각 선언 순서)
+        self.order = {self.signals[c][0]: rank for rank, c in enumerate(self.buy_codes + self.sell_codes + (0,))}
+        reasons = spec.get('reasons', {})
+        self.reasons = {side: [(Expr(src), fmt) for src, fmt in reasons.get(side, [])] for side in ('buy', 'sell')}
+        self.trend = Expr(spec.get('trend', 'up'))
+        self.names = frozenset().union(*(e.names for e in self._exprs()))
+
+    def _levels(self, key):
+        levels = self.spec.get(key, {})
+        return tuple(levels), [Expr(src) for src in levels.values()]
+
+    def __reduce__(self):
+        # 코드 객체는 피클되지 않으므로 명세에서 다시 컴파일 (프로세스 풀로 넘길 때)
+        return RuleSet, (self.spec,)
+
+    def __repr__(self):
+        return f"RuleSet({self.name!r})"
+
+    def evaluate(self, f):
+        # f: 티커축 (N,) 특징 배열 dict → 점수/등급 dict (score_features 와 같은 키 + 근거 적중)
+        close = np.asarray(f['close'])
+        n = len(close)
+        scope = dict(f)
+        missing = self.names - set(scope) - {
+            'hit_sup', 'hit_res', 'n_sup', 'n_res', 'buy', 'sell', *(name for name, _ in self.define)}
+        if missing: raise ValueError(f"규칙 세트 {self.name}: 알 수 없는 이름 {', '.join(sorted(missing))}")
+
+        c = close[:, None]
+        lo, hi = self.support_band
+        supports = np.stack([e(scope, n) for e in self.supports], axis=1) if self.supports else np.zeros((n, 0))
+        resistances = np.stack([e(scope, n) for e in self.resistances], axis=1) if self.resistances else np.zeros((n, 0))
+        hit_sup = (supports > 0) & (c <= supports * hi) & (c >= supports * lo)
+        hit_res = (resistances > 0) & (c >= resistances * self.resistance_band)
+        scope.update(hit_sup=hit_sup, hit_res=hit_res, n_sup=hit_sup.sum(axis=1), n_res=hit_res.sum(axis=1))
+        for name, expr in self.define: scope[name] = expr(scope, n)
+
+        buy, sell = np.zeros(n), np.zeros(n)
+        for expr, w in self.buy_terms: buy = buy + expr(scope, n) * w
+        for expr, w in self.sell_terms: sell = sell + expr(scope, n) * w
+        scope.update(buy=buy, sell=sell)
+
+        code = np.select([e(scope, n).astype(bool) for e in self.tiers], list(range(1, len(self.tiers) + 1)), 0)
+        reasons = {side: np.stack([e(scope, n).astype(bool) for e, _ in terms], axis=1) if terms else np.zeros((n, 0), dtype=bool)
+                   for side, terms in self.reasons.items()}
+        return {'buy_score': buy, 'sell_score': sell, 'hit_sup': hit_sup, 'hit_res': hit_res,
+                'up': np.asarray(self.trend(scope, n), dtype=bool), 'code': code, 'reasons': reasons}
+
+    def _exprs(self):
+        yield from self.supports
+        yield from self.resistances
+        yield from (e for _, e in self.define)
+        yield from (e for e, _ in self.buy_terms + self.sell_terms)
+        yield from self.tiers
+        yield from (e for terms in self.reasons.values() for e, _ in terms)
+        yield self.trend
+
+    def describe(self, i, f, s):
+        # 티커 i 의 신호 문자열: "등급 (근거, ...)"
+        code = int(s['code'][i])
+        signal = self.signals[code][0]
+        if not code: return signal
+        if code in self.buy_codes: side, names, hits = 'buy', self.support_names, s['hit_sup'][i]
+        else: side, names, hits = 'sell', self.resistance_names, s['hit_res'][i]
+        reasons = [name for name, hit in zip(names, hits) if hit]
+        extra = [fmt for (_, fmt), hit in zip(self.reasons[side], s['reasons'][side][i]) if hit]
+        if extra:
+            row = {k: v[i] for k, v in f.items() if np.ndim(v) == 1}
+            reasons += [fmt.format_map(row) for fmt in extra]
+        return f"{signal} ({', '.join(reasons)})" if reasons else signal
+
+def compile_rules(spec):
+    return spec if isinstance(spec, RuleSet) else RuleSet(spec)
+
+def load_rules(path):
+    # JSON 파일 (또는 PRESETS 이름) → [RuleSet]. 파일 하나에 규칙 세트 하나 (dict) 또는 여러 개 (list)
+    if path in PRESETS: return [compile_rules(PRESETS[path])]
+    with open(path, encoding='utf-8') as f: data = json.load(f)
+    return [compile_rules(spec) for spec in (data if isinstance(data, list) else [data])]
+
+DEFAULT = compile_rules(V14_3)
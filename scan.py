@@ -0,0 +1,290 @@
+# 헤드리스 스캔 코어 + CLI
+# 일봉(저장소) → 실시간 틱 주입 → 벡터 분석(상태 캐시) → 손절/랭킹. Streamlit 없이 import/실행 가능하고,
+# 대규모 유니버스는 티커 청크 단위로 프로세스 풀에 나눠 돌린다. 메모리가 작은 환경에서는 --stream 으로
+# 고정 크기 배치마다 결과 행까지 줄이고 일봉/패널을 버린다 (최대 메모리가 종목 수와 무관).
+#   python scan.py --market kr --file kospi.txt --out result.parquet --workers 8
+#   python scan.py --market kr --universe krx --stream --batch 250 --out result.parquet
+import argparse
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from engine import (KOREA, panel_from_batch, concat_panels, subset_panel, inject_ticks, analyze_states, analyze_rulesets,
+                    finalize_state, LEVEL_COLUMN)
+from krx import KrxCodeTable
+from levels import LEVEL_BAND, LEVEL_FEATURES, LevelIndex
+from metrics import BYTES_NOTE, Trace, current, record, stage, tracing
+from names import SymbolDirectory
+from realtime import fetch_snapshots, as_ticks
+from rules import compile_rules, load_rules
+from store import BarStore
+
+US = '미국 증시 (US)'
+MARKETS = {'us': US, 'kr': KOREA}
+STOP_LOSS_MODES = {'atr': "ATR 기반 (권장)", 'pivot': "피봇 지지선 (S1) 기준", 'pct': "고정 비율 (%)"}
+SIGNAL_ORDER = {'💎':0, '🔥':1, '✅':2, '⚠️':3, '🚨':4, '📉':5, '관':6}
+COLUMNS = ["티커", "종목명", "신호", "현재가", "체결시간", "손절가", "목표가", "피보나치(0.618)", "RSI", "추세"]
+COMPACT_FLOATS = ("현재가", "목표가", "피보나치(0.618)", "RSI")   # 스트리밍 결과에서 float32 로 보관
+COMPACT_CATEGORIES = ("규칙", "체결시간", "추세")                # 값 종류가 적은 열
+BATCH = 250
+
+def normalize_tickers(raw, market, krx=None):
+    # 스마트 티커 처리: 한국 시장의 숫자 코드는 KRX 코드 테이블로 .KS/.KQ 를 정한다 (테이블이 없으면 .KS)
+    if isinstance(raw, str): raw = raw.split(',')
+    tickers = []
+    for t in (t.strip().upper() for t in raw):
+        if not t: continue
+        if market == KOREA and t.isdigit(): tickers.append(krx.resolve(t) if krx else f"{t}.KS")
+        else: tickers.append(t)
+    return tickers
+
+def load_panel(tickers, store, notify=None, period="1y"):
+    # 일봉 (로컬 저장소 + 부족분만 다운로드) → (티커 × 날짜 × 필드) 패널. → (panel, order, errors)
+    notify = notify or (lambda *a: None)
+    errors = []
+    notify('daily', 0, len(tickers), None)
+    panel, missing = panel_from_batch(store.daily_batch(tickers, period=period), tickers)
+
+    # Data A: 배치에 없는 .KS 티커는 .KQ 로 재시도 (한 번의 배치로)
+    resolved = {t: t.replace(".KS", ".KQ") for t in missing if ".KS" in t}
+    if resolved:
+        alts = list(resolved.values())
+        alt_panel, _ = panel_from_batch(store.daily_batch(alts, period=period), alts)
+        panel = concat_panels(panel, alt_panel)
+        resolved = {t: alt for t, alt in resolved.items() if alt in alt_panel['tickers']}
+        for alt in alts: record('fallback', ticker=alt)
+
+    order = []
+    for ticker in tickers:
+        ticker = resolved.get(ticker, ticker)
+        if ticker in panel['tickers'] and panel['length'][panel['tickers'].index(ticker)]: order.append(ticker)
+        else: errors.append({"티커": ticker, "신호": "데이터 없음"})
+    return subset_panel(panel, order), order, errors
+
+def resolve_names(names, krx, tickers, notify=None):
+    # 종목명: 디렉터리에 없는 티커만 한 번에 동시 조회 (한국 종목명은 KRX 코드 테이블에 이미 있다)
+    notify = notify or (lambda *a: None)
+    misses = names.misses(tickers)
+    if krx is not None and misses:
+        listed = krx.symbol_entries()
+        names.bulk_load({t: listed[t] for t in misses if t in listed})
+        misses = names.misses(tickers)
+    notify('names', 0, len(misses), None)
+    names.resolve(tickers)
+
+def scan_states(tickers, market, store=None, realtime=True, names=None, krx=None, progress=None, cache=None, rules=None, levels=None):
+    # → (states, rt_labels, errors). 손절 파라미터와 무관한 단계까지만 돈다 - 결과 행은 finalize_results 로 만든다.
+    # progress(stage, done, total, ticker) 는 호출한 스레드에서 불린다.
+    # rules 가 규칙 세트 목록이면 지표는 한 번만 계산하고 세트마다 상태를 낸다 (상태에 "규칙" 이름이 붙는다)
+    # levels(levels.LevelIndex) 를 넘기면 호출 사이에 들고 있으면서 새 봉이 붙은 티커의 레벨만 갱신한다
+    notify = progress or (lambda *a: None)
+    with stage('daily'): panel, order, errors = load_panel(tickers, store or BarStore(), notify)
+
+    # Data B: Real-time (동시 스냅샷 - 마지막 체결만)
+    with stage('realtime'):
+        ticks = as_ticks(fetch_snapshots(order, on_done=lambda d, n, t: notify('realtime', d, n, t))) if realtime else {}
+
+    # Tick Injection + 분석 실행 (전 종목 한 번에, 캐시에 있는 상태는 재사용)
+    notify('analyze', 0, len(order), None)
+    with stage('analyze'):
+        panel, rt_labels = inject_ticks(panel, ticks)
+        if isinstance(rules, (list, tuple)):
+            rules = [compile_rules(r) for r in rules]
+            runs = analyze_rulesets(panel, rules, cache, levels)
+            states = [{**st, "규칙": r.name} for r, sts in zip(rules, runs) for st in sts]
+        else: states = analyze_states(panel, cache, rules, levels)
+    if names is not None:
+        with stage('names'): resolve_names(names, krx, order, notify)
+    return states, rt_labels, errors
+
+def finalize_results(states, rt_labels, market, stop_loss_mode="ATR 기반 (권장)", names=None, **kwargs):
+    # 손절가·체결시간·종목명만 붙이는 가벼운 단계 - 사이드바 파라미터가 바뀌면 이것만 다시 돈다
+    results, errors = [], []
+    with stage('finalize'):
+        for st in states:
+            res = finalize_state(st, rt_labels.get(st["티커"]), stop_loss_mode, market, **kwargs)
+            if names is not None: res["종목명"] = names.get(res["티커"])
+            if "오류" in res.get("신호", ""): errors.append(res)
+            else: results.append(res)
+    return results, errors
+
+def scan(tickers, market, stop_loss_mode="ATR 기반 (권장)", store=None, realtime=True, names=None, krx=None, progress=None, cache=None,
+         rules=None, levels=None, **kwargs):
+    # → (results, errors)
+    states, rt_labels, errors = scan_states(tickers, market, store, realtime, names, krx, progress, cache, rules, levels)
+    results, failed = finalize_results(states, rt_labels, market, stop_loss_mode, names, **kwargs)
+    return results, errors + failed
+
+def rank_keys(res_df, rules=None):
+    # 신호 등급순 정렬 키. 규칙 세트를 주면 그 세트의 등급 순서 (여러 세트면 행의 "규칙" 으로 고른다), 없으면 v14.3 이모지 순서
+    if rules is None: return res_df['신호'].apply(lambda x: SIGNAL_ORDER.get(x[0], 9))
+    rulesets = [compile_rules(r) for r in (rules if isinstance(rules, (list, tuple)) else [rules])]
+    by_name = {r.name: r for r in rulesets}
+    return [by_name.get(name, rulesets[0]).order.get(signal.split(" (")[0], len(SIGNAL_ORDER))
+            for signal, name in zip(res_df['신호'], res_df.get('규칙', [None] * len(res_df)))]
+
+def rank_results(results, rules=None):
+    res_df = pd.DataFrame(results)
+    res_df['sort'] = rank_keys(res_df, rules)
+    return res_df.sort_values('sort')
+
+class RankedResults:
+    """배치마다 들어오는 결과 행을 등급별 버킷에 쌓는 순위표. 필요한 열만 작은 dtype 으로 보관한다."""
+
+    def __init__(self, columns=COLUMNS, rules=None):
+        self.columns = ["규칙"] + list(columns) if isinstance(rules, (list, tuple)) else list(columns)
+        self.rules = rules
+        self.errors = []
+        self._buckets = {}
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    def add(self, results, errors=()):
+        self.errors += errors
+        if not results: return
+        df = pd.DataFrame(results)
+        keys = np.asarray(rank_keys(df, self.rules))
+        df = df[[c for c in self.columns if c in df.columns]]
+        df = df.astype({c: np.float32 for c in COMPACT_FLOATS if c in df.columns})
+        # 같은 등급 안에서는 들어온 순서를 지킨다
+        for key in np.unique(keys): self._buckets.setdefault(key, []).append(df[keys == key])
+        self._count += len(df)
+
+    def frame(self):
+        parts = [part for key in sorted(self._buckets) for part in self._buckets[key]]
+        if not parts: return pd.DataFrame(columns=self.columns)
+        out = pd.concat(parts, ignore_index=True)
+        return out.astype({c: 'category' for c in COMPACT_CATEGORIES if c in out.columns})
+
+def color_sig(val):
+    if '💎' in val: return 'color: purple; font-weight: bold; background-color: #f0f0f5'
+    if '🔥' in val: return 'color: red; font-weight: bold'
+    if '✅' in val: return 'color: orange; font-weight: bold'
+    if '🚨' in val: return 'color: blue; font-weight: bold'
+    if '📉' in val: return 'color: skyblue; font-weight: bold'
+    if '⚠️' in val: return 'color: gray'
+    return ''
+
+def style_results(res_df, market, columns=COLUMNS):
+    # 결과표 서식 (통화 / 신호 색상) - 화면과 벤치마크가 같은 코드를 쓴다
+    cur = "₩{:,.0f}" if market == KOREA else "${:,.2f}"
+    fmt = {"현재가": cur, "목표가": cur, "피보나치(0.618)": cur, "RSI": "{:.1f}"}
+    return res_df[list(columns)].style.format(fmt).map(color_sig, subset=['신호'])
+
+# --- 스트리밍 실행 (고정 크기 배치, 한 프로세스) ---
+def scan_stream(tickers, market, stop_loss_mode="ATR 기반 (권장)", batch_size=BATCH, store=None, realtime=True, names=None,
+                krx=None, progress=None, cache=None, rules=None, levels=None, **kwargs):
+    # 배치마다 받기 → 분석 → 결과 행까지 줄이고 (results, errors) 를 내보낸다. 배치의 일봉 프레임/패널은 다음 배치 전에 버린다
+    store = store or BarStore()
+    for i in range(0, len(tickers), batch_size):
+        batch = tickers[i:i + batch_size]
+        try: yield scan(batch, market, stop_loss_mode, store, realtime, names, krx, progress, cache, rules, levels, **kwargs)
+        finally: store.release()
+
+# --- 병렬 실행 (프로세스 풀 / 티커 청크) ---
+def _scan_chunk(job):
+    # → (results, errors, 계측 이벤트 또는 None). 프로세스 경계를 넘지 못하는 Trace 대신 이벤트 목록을 돌려준다
+    tickers, market, store_root, names, traced, memory, options = job
+    krx = KrxCodeTable() if market == KOREA else None
+    trace = Trace(memory=memory) if traced else None
+    with tracing(trace):
+        results, errors = scan(tickers, market, store=BarStore(store_root), names=SymbolDirectory() if names else None, krx=krx, **options)
+    return results, errors, trace.events if trace else None
+
+def scan_parallel(tickers, market, workers=None, chunk_size=200, store_root=None, names=False, **options):
+    # 호출 측에 Trace 가 켜져 있으면 청크별 계측을 모아 합친다
+    trace = current()
+    chunks = [tickers[i:i + chunk_size] for i in range(0, len(tickers), chunk_size)]
+    memory = trace is not None and trace.memory
+    jobs = [(chunk, market, store_root, names, trace is not None, memory, options) for chunk in chunks]
+    if workers == 1 or len(chunks) <= 1: outputs = [_scan_chunk(job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool: outputs = list(pool.map(_scan_chunk, jobs))
+    results, errors = [], []
+    for res, err, events in outputs:
+        results += res; errors += err
+        if events: trace.extend(events)
+    return results, errors
+
+def write_table(df, path):
+    if path.endswith('.parquet'): df.to_parquet(path, index=False)
+    else: df.to_csv(path, index=False, encoding='utf-8-sig')
+
+def read_ticker_file(path):
+    with open(path, encoding='utf-8') as f:
+        return [t for line in f for t in line.replace(',', ' ').split()]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Quant Screener v14.3 headless scan")
+    parser.add_argument('tickers', nargs='*', help="티커 (쉼표/공백 구분)")
+    parser.add_argument('--file', action='append', default=[], help="티커 목록 파일 (여러 번 지정 가능)")
+    parser.add_argument('--market', choices=MARKETS, default='us')
+    parser.add_argument('--out', default='scan_results.csv', help=".csv 또는 .parquet")
+    parser.add_argument('--errors', help="실패 목록 저장 경로")
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--chunk', type=int, default=200)
+    parser.add_argument('--stop-loss', choices=STOP_LOSS_MODES, default='atr')
+    parser.add_argument('--atr-k', type=float, default=2.0)
+    parser.add_argument('--pct', type=float, default=3.0)
+    parser.add_argument('--no-realtime', action='store_true', help="실시간 틱 주입 생략 (야간 스캔)")
+    parser.add_argument('--names', action='store_true', help="종목명 조회")
+    parser.add_argument('--data-dir', help="일봉 저장소 경로")
+    parser.add_argument('--universe', choices=['kospi', 'kosdaq', 'krx'], help="KRX 상장 종목 전체를 대상에 추가")
+    parser.add_argument('--trace', help="단계/티커별 계측 이벤트 저장 경로 (.json 또는 .csv)")
+    parser.add_argument('--trace-memory', action='store_true', help="단계별 파이썬 할당 최대치를 tracemalloc 으로 잰다 (느려진다)")
+    parser.add_argument('--rules', action='append', default=[],
+                        help="규칙 세트 JSON 또는 내장 이름 v14.3 / v14.3-mtf (여러 번 지정 가능, 세트가 둘 이상이면 결과에 규칙 열이 붙는다)")
+    parser.add_argument('--levels', action='store_true',
+                        help="다중 시간대 레벨 (일/주/월봉 피벗·피보나치, 거래량 프로파일) 근접 수 열을 붙이고 mtf_* 특징을 켠다")
+    parser.add_argument('--level-band', type=float, default=LEVEL_BAND * 100, help="레벨 근접 밴드 (현재가 ± %%)")
+    parser.add_argument('--stream', action='store_true', help="한 프로세스에서 고정 크기 배치로 스트리밍 (최대 메모리 고정)")
+    parser.add_argument('--batch', type=int, default=BATCH, help="--stream 배치 크기")
+    args = parser.parse_intermixed_args(argv)
+
+    market = KOREA if args.universe else MARKETS[args.market]
+    krx = KrxCodeTable() if market == KOREA else None
+    raw = [t for arg in args.tickers for t in arg.split(',')] + [t for path in args.file for t in read_ticker_file(path)]
+    if args.universe: raw += krx.universe({'kospi': 'KOSPI', 'kosdaq': 'KOSDAQ'}.get(args.universe))
+    tickers = list(dict.fromkeys(normalize_tickers(raw, market, krx)))
+    if not tickers: parser.error("분석할 종목을 입력해주세요.")
+    try: rulesets = [r for path in args.rules for r in load_rules(path)]
+    except (OSError, ValueError) as e: parser.error(f"규칙 세트를 읽을 수 없습니다: {e}")
+    rules = rulesets if len(rulesets) > 1 else (rulesets[0] if rulesets else None)
+    # mtf_sup / mtf_res / vp_poc 를 읽는 규칙 세트는 레벨 없이는 평가할 수 없으므로 --levels 를 켠다
+    use_levels = args.levels or any(r.names & LEVEL_FEATURES for r in rulesets)
+    levels = LevelIndex(args.level_band / 100) if use_levels else None
+
+    options = dict(stop_loss_mode=STOP_LOSS_MODES[args.stop_loss], realtime=not args.no_realtime,
+                   atr_multiplier=args.atr_k, stop_loss_pct=args.pct, rules=rules, levels=levels)
+    columns = (["규칙"] if len(rulesets) > 1 else []) + COLUMNS + ([LEVEL_COLUMN] if levels is not None else [])
+    trace = Trace(memory=args.trace_memory) if args.trace else None
+    with tracing(trace):
+        if args.stream:
+            # 배치 결과는 작은 순위표에만 쌓고 행 dict 는 바로 버린다
+            ranked = RankedResults(COLUMNS + ([LEVEL_COLUMN] if levels is not None else []), rules=rules)
+            names = SymbolDirectory() if args.names else None
+            for results, errors in scan_stream(tickers, market, batch_size=args.batch, store=BarStore(args.data_dir),
+                                               names=names, krx=krx, **options):
+                ranked.add(results, errors)
+                print(f"{len(ranked) + len(ranked.errors)}/{len(tickers)} 종목 처리", file=sys.stderr)
+            res_df, count, errors = ranked.frame(), len(ranked), ranked.errors
+        else:
+            results, errors = scan_parallel(tickers, market, workers=args.workers, chunk_size=args.chunk,
+                                            store_root=args.data_dir, names=args.names, **options)
+            res_df, count = (rank_results(results, rules) if results else pd.DataFrame()), len(results)
+    if trace:
+        trace.export(args.trace)
+        print(trace.summary().to_string(float_format=lambda x: f"{x:,.3f}"), file=sys.stderr)
+        print(BYTES_NOTE, file=sys.stderr)
+    if count: write_table(res_df[[c for c in columns if c in res_df.columns]], args.out)
+    if errors and args.errors: write_table(pd.DataFrame(errors), args.errors)
+    print(f"분석 완료: {count}건, 실패 {len(errors)}건 → {args.out}", file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,211 @@
+# 로컬 일봉 저장소 (티커별 Parquet) + 교체 가능한 데이터 소스
+# 저장된 마지막 봉부터만 다시 받아 붙이고, 화면에는 yf.download(group_by='ticker') 와 같은 모양으로 돌려준다.
+import contextlib
+import json
+import os
+import threading
+import time
+import numpy as np
+import pandas as pd
+import yfinance as yf
+
+from engine import normalize_frame
+from metrics import record
+
+try: import fcntl
+except ImportError: fcntl = None  # Windows
+
+DATA_DIR = os.environ.get("QUANT_SCREENER_DATA", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache"))
+OHLCV = ['open', 'high', 'low', 'close', 'volume']
+
+def period_start(period, now=None):
+    # "1y" / "6mo" / "10y" / "30d" → 시작일 (yfinance period 와 같은 해석)
+    now = pd.Timestamp(now or pd.Timestamp.today()).normalize()
+    n, unit = int(period.rstrip('dmoy')), period.lstrip('0123456789')
+    offset = {'d': pd.DateOffset(days=n), 'mo': pd.DateOffset(months=n), 'y': pd.DateOffset(years=n)}[unit]
+    return now - offset
+
+def split_batch(batch, tickers):
+    # yf.download 결과 → {티커: 소문자 OHLCV DataFrame} (해당 티커가 거래하지 않은 정렬용 빈 행은 제외)
+    if batch is None or batch.empty: return {}
+    level0 = set(batch.columns.get_level_values(0)) if isinstance(batch.columns, pd.MultiIndex) else set()
+    if level0 & set(tickers): frames = {t: normalize_frame(batch[t]) for t in tickers if t in level0}
+    else: frames = {tickers[0]: normalize_frame(batch)}
+    out = {}
+    for t, df in frames.items():
+        df = df.reindex(columns=OHLCV).dropna(how='all')
+        if df.empty: continue
+        df.index = pd.DatetimeIndex(df.index).tz_localize(None) if getattr(df.index, 'tz', None) else pd.DatetimeIndex(df.index)
+        df.index.name = 'date'
+        out[t] = df
+    return out
+
+def join_frames(frames, tickers):
+    # 티커별 프레임을 날짜 합집합으로 정렬한 wide 프레임 (yf.download 와 같은 (티커, 필드) 컬럼)
+    present = [t for t in dict.fromkeys(tickers) if t in frames]
+    if not present: return pd.DataFrame()
+    return pd.concat({t: frames[t] for t in present}, axis=1).sort_index()
+
+# --- 1. 데이터 소스 ---
+class YahooSource:
+    name = "yahoo"
+
+    def download(self, tickers, start=None, period=None):
+        kwargs = {'start': start.strftime("%Y-%m-%d")} if start is not None else {'period': period or "1y"}
+        record('request', len(tickers))  # yf.download 는 티커마다 차트 요청 하나
+        batch = yf.download(list(tickers), group_by='ticker', progress=False, **kwargs)
+        # 응답 바이트가 아니라 받은 표의 메모리 크기 (네트워크 bytes 와 따로 남긴다)
+        if batch is not None: record('frame_bytes', int(batch.memory_usage(index=True).sum()))
+        return batch
+
+class FixtureSource:
+    # 로컬 파일({root}/{티커}.csv|.parquet) 또는 {티커: DataFrame} 으로 Yahoo 를 대신하는 소스
+    name = "fixture"
+
+    def __init__(self, frames_or_dir):
+        self.frames, self.root = (None, frames_or_dir) if isinstance(frames_or_dir, str) else (frames_or_dir, None)
+        self.calls = []
+
+    def _read(self, ticker):
+        if self.frames is not None: return self.frames.get(ticker)
+        for ext, reader in (('.parquet', pd.read_parquet), ('.csv', lambda p: pd.read_csv(p, index_col=0, parse_dates=True))):
+            path = os.path.join(self.root, _file_name(ticker) + ext)
+            if os.path.exists(path): return reader(path)
+        return None
+
+    def download(self, tickers, start=None, period=None):
+        self.calls.append((tuple(tickers), start, period))
+        start = start if start is not None else period_start(period or "1y")
+        frames = {}
+        for t in tickers:
+            df = self._read(t)
+            if df is None: continue
+            df = normalize_frame(df)
+            frames[t] = df[pd.DatetimeIndex(df.index) >= start]
+        return join_frames(frames, tickers)
+
+# --- 2. 저장소 ---
+def _file_name(ticker):
+    return ticker.replace('/', '_').replace('\\', '_')
+
+@contextlib.contextmanager
+def file_lock(path, timeout=30.0):
+    # 프로세스 간 배타 잠금. fcntl 이 없으면 O_EXCL 잠금 파일로 대신한다 (timeout 초 넘게 남은 잠금 파일은 죽은 프로세스 것으로 본다)
+    if fcntl is not None:
+        with open(path, 'a') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try: yield
+            finally: fcntl.flock(f, fcntl.LOCK_UN)
+        return
+    deadline = time.monotonic() + timeout
+    while True:
+        try: fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY); break
+        except FileExistsError:
+            if time.monotonic() > deadline:
+                with contextlib.suppress(OSError): os.remove(path)
+                deadline = time.monotonic() + timeout
+            time.sleep(0.05)
+    try: yield
+    finally:
+        os.close(fd)
+        with contextlib.suppress(OSError): os.remove(path)
+
+class BarStore:
+    def __init__(self, root=None, source=None, ttl=600):
+        self.root = root or os.path.join(DATA_DIR, "bars")
+        self.source = source or YahooSource()
+        self.ttl = ttl  # 이 시간(초) 안에 받은 티커는 다시 묻지 않는다
+        os.makedirs(self.root, exist_ok=True)
+        self._meta_path = os.path.join(self.root, "_meta.json")
+        self._frames = {}
+        self._lock = threading.Lock()
+
+    def _path(self, ticker):
+        return os.path.join(self.root, _file_name(ticker) + ".parquet")
+
+    def _load_meta(self):
+        try:
+            with open(self._meta_path, encoding='utf-8') as f: return json.load(f)
+        except (OSError, ValueError): return {}
+
+    def _save_meta(self, updates):
+        # 여러 프로세스가 같은 저장소를 쓰므로 잠금 안에서 다시 읽어 내 티커 항목만 고친다 (읽기→쓰기 사이에 남의 갱신을 잃지 않도록)
+        with file_lock(f"{self._meta_path}.lock"):
+            meta = self._load_meta()
+            for t, info in updates.items(): meta.setdefault(t, {}).update(info)
+            tmp = f"{self._meta_path}.{os.getpid()}.tmp"
+            with open(tmp, 'w', encoding='utf-8') as f: json.dump(meta, f)
+            os.replace(tmp, self._meta_path)
+
+    def read(self, ticker):
+        if ticker not in self._frames:
+            try: self._frames[ticker] = pd.read_parquet(self._path(ticker))
+            except (OSError, ValueError): return None
+        return self._frames[ticker]
+
+    def write(self, ticker, df):
+        tmp = f"{self._path(ticker)}.{os.getpid()}.tmp"
+        df.to_parquet(tmp)
+        os.replace(tmp, self._path(ticker))
+        self._frames[ticker] = df
+
+    def release(self, tickers=None):
+        # 메모리에 올려 둔 프레임만 버린다 (디스크 파일은 그대로) - 스트리밍 스캔이 배치마다 부른다
+        with self._lock:
+            if tickers is None: self._frames.clear()
+            else:
+                for t in tickers: self._frames.pop(t, None)
+
+    def _same_bar(self, old, new, day):
+        # 겹치는 확정 봉의 수정주가가 달라졌으면 (배당/분할) 전체를 다시 받아야 한다
+        if day not in old.index or day not in new.index: return True
+        return bool(np.isclose(old.at[day, 'close'], new.at[day, 'close'], rtol=1e-6, equal_nan=True))
+
+    def update(self, tickers, period="1y"):
+        # 티커별로 모자란 날짜만 받아온다. 같은 시작일끼리 묶어 한 번의 배치 요청으로 보낸다
+        with self._lock:
+            meta, now = self._load_meta(), time.time()
+            since = period_start(period)
+            full, incremental = [], {}
+            for t in dict.fromkeys(tickers):
+                info, df = meta.get(t, {}), self.read(t)
+                fresh = now - info.get('fetched', 0) < self.ttl
+                covered = 'since' in info and pd.Timestamp(info['since']) <= since
+                if df is None or df.empty or not covered:
+                    # 방금 받았는데 데이터가 없던 티커는 ttl 동안 다시 묻지 않는다
+                    if not (fresh and covered): full.append(t); record('cache_miss', ticker=t)
+                    else: record('cache_hit', ticker=t)
+                elif not fresh:
+                    # 마지막 봉은 장중 미완성일 수 있으므로 직전 확정 봉부터 다시 받는다
+                    incremental.setdefault(df.index[max(len(df) - 2, 0)], []).append(t)
+                    record('cache_hit', ticker=t)
+                else: record('cache_hit', ticker=t)
+
+            fetched = []
+            for start, group in incremental.items():
+                for t, new in split_batch(self.source.download(group, start=start), group).items():
+                    old = self.read(t)
+                    if not self._same_bar(old, new, start):
+                        record('fallback', ticker=t)  # 수정주가 변경 → 전체 재다운로드
+                        full.append(t); continue
+                    self.write(t, pd.concat([old[old.index < new.index[0]], new]))
+                fetched += [t for t in group if t not in full]
+            if full:
+                for t, new in split_batch(self.source.download(full, period=period), full).items(): self.write(t, new)
+                for t in full: meta.setdefault(t, {})['since'] = str(since.date())
+                fetched += full
+            for t in fetched: meta.setdefault(t, {})['fetched'] = now
+            if fetched: self._save_meta({t: meta[t] for t in fetched})
+            return fetched
+
+    def load(self, tickers, period="1y"):
+        since = period_start(period)
+        frames = {}
+        for t in tickers:
+            df = self.read(t)
+            if df is not None and not df.empty: frames[t] = df[df.index >= since]
+        return join_frames(frames, tickers)
+
+    def daily_batch(self, tickers, period="1y"):
+        self.update(tickers, period)
+        return self.load(tickers, period)
@@ -0,0 +1,153 @@
+# 패널 엔진 이전의 티커별 분석 경로 (v14.3 app.py 의 analyze_dataframe + 틱 주입) - 회귀 비교용 기준.
+# 지표는 pandas_ta 0.3.14b 의 pandas 경로(sma / rsi / bbands / atr, talib 미사용)를 그대로 옮겨 pandas_ta 없이도 돈다.
+import sys
+
+import numpy as np
+import pandas as pd
+
+def _non_zero_range(high, low):
+    diff = high - low
+    if diff.eq(0).any().any(): diff += sys.float_info.epsilon
+    return diff
+
+def _rma(x, length):
+    return x.ewm(alpha=1.0 / length, min_periods=length).mean()
+
+def _sma(df, length):
+    if df['close'].size < length: return
+    df[f"SMA_{length}"] = df['close'].rolling(length, min_periods=length).mean()
+
+def _rsi(df, length):
+    close = df['close']
+    if close.size < length: return
+    negative = close.diff(1)
+    positive = negative.copy()
+    positive[positive < 0] = 0
+    negative[negative > 0] = 0
+    pos, neg = _rma(positive, length), _rma(negative, length)
+    df[f"RSI_{length}"] = 100 * pos / (pos + neg.abs())
+
+def _bbands(df, length, std):
+    close = df['close']
+    if close.size < length: return
+    std = float(std)
+    dev = std * close.rolling(length, min_periods=length).var(0).apply(np.sqrt)
+    mid = close.rolling(length, min_periods=length).mean()
+    lower, upper = mid - dev, mid + dev
+    ulr = _non_zero_range(upper, lower)
+    df[f"BBL_{length}_{std}"], df[f"BBM_{length}_{std}"], df[f"BBU_{length}_{std}"] = lower, mid, upper
+    df[f"BBB_{length}_{std}"] = 100 * ulr / mid
+    df[f"BBP_{length}_{std}"] = _non_zero_range(close, lower) / ulr
+
+def _atr(df, length):
+    high, low, close = df['high'], df['low'], df['close']
+    if high.size < length: return
+    prev_close = close.shift(1)
+    tr = pd.concat([_non_zero_range(high, low), high - prev_close, prev_close - low], axis=1).abs().max(axis=1)
+    tr.iloc[:1] = np.nan
+    df[f"ATRr_{length}"] = _rma(tr, length)
+
+def get_pivot_points(df):
+    if len(df) < 2: return 0, 0, 0, 0, 0
+    last = df.iloc[-2]
+    h, l, c = last['high'], last['low'], last['close']
+    p = (h + l + c) / 3
+    return p, (2 * p) - h, p - (h - l), (2 * p) - l, p + (h - l)
+
+def get_fibonacci_levels(df, period=120):
+    recent = df.tail(min(period, len(df)))
+    max_h, min_l = recent['high'].max(), recent['low'].min()
+    diff = max_h - min_l
+    return max_h - (diff * 0.618), max_h - (diff * 0.5), max_h, min_l
+
+def get_max_vol_price(df, period=240):
+    recent = df.tail(min(period, len(df)))
+    return recent.loc[recent['volume'].idxmax()]['close']
+
+def add_indicators(df):
+    # df.ta.sma(20/60/120/200) / rsi(14) / bbands(20, 2) / atr(14), append=True
+    for n in (20, 60, 120, 200): _sma(df, n)
+    _rsi(df, 14)
+    _bbands(df, 20, 2)
+    _atr(df, 14)
+    return df
+
+def analyze_dataframe(ticker, df, rt_date_str, stop_loss_mode, market, **kwargs):
+    try:
+        df = add_indicators(df).dropna()
+        if len(df) < 5: return {"티커": ticker, "신호": "데이터 부족"}
+
+        cols = df.columns
+        bbl_col = next((c for c in cols if 'BBL' in str(c)), None)
+        bbu_col = next((c for c in cols if 'BBU' in str(c)), None)
+        sma200_col = next((c for c in cols if 'SMA_200' in str(c)), None)
+        sma60_col = next((c for c in cols if 'SMA_60' in str(c)), None)
+        sma120_col = next((c for c in cols if 'SMA_120' in str(c)), None)
+        atr_col = next((c for c in cols if 'ATRr' in str(c)), None)
+        if not all([bbl_col, bbu_col, sma200_col, sma60_col, atr_col]): return {"티커": ticker, "신호": "지표 실패"}
+
+        latest = df.iloc[-1]
+        close, rsi = latest['close'], latest['RSI_14']
+        currency = "₩" if market == '한국 증시 (Korea)' else "$"
+        p, s1, s2, r1, r2 = get_pivot_points(df)
+        fib_618, fib_500, swing_high, swing_low = get_fibonacci_levels(df)
+        max_vol_price = get_max_vol_price(df)
+
+        buy_score, buy_reasons = 0, []
+        trend = "상승" if close > latest[sma200_col] else "하락"
+        if close > p: buy_score += 0.5
+        supports = {"볼린저하단": latest[bbl_col], "피벗S1": s1, "피보나치(0.618)": fib_618,
+                    "60일선": latest[sma60_col], "120일선": latest[sma120_col], "최대매물대": max_vol_price}
+        hit_supports = [name for name, price in supports.items() if price > 0 and price * 0.975 <= close <= price * 1.025]
+        if hit_supports:
+            buy_score += len(hit_supports) * 1.5
+            buy_reasons.extend(hit_supports)
+        if rsi < 35: buy_score += 2; buy_reasons.append(f"RSI과매도({rsi:.1f})")
+        elif rsi < 50 and trend == "상승": buy_score += 1
+
+        sell_score, sell_reasons = 0, []
+        resistances = {"볼린저상단": latest[bbu_col], "피벗R1": r1, "피벗R2": r2, "전고점": swing_high}
+        hit_resistances = [name for name, price in resistances.items() if price > 0 and close >= price * 0.98]
+        if hit_resistances:
+            sell_score += len(hit_resistances) * 1.5
+            sell_reasons.extend(hit_resistances)
+        if rsi > 70: sell_score += 2; sell_reasons.append(f"RSI과매수({rsi:.1f})")
+        elif rsi > 65: sell_score += 1
+
+        signal, color = "관망", "black"
+        if rsi < 60:
+            if buy_score >= 5 or (trend == "상승" and len(hit_supports) >= 3): signal, color = "💎 인생 매수", "purple"
+            elif buy_score >= 3.5 or (trend == "상승" and len(hit_supports) >= 2): signal, color = "🔥 강력 매수", "red"
+            elif trend == "상승" and rsi < 55 and (buy_score >= 2 or len(hit_supports) >= 1): signal, color = "✅ 매수 고려", "orange"
+        if signal == "관망":
+            if sell_score >= 3 or (len(hit_resistances) >= 1 and rsi > 70): signal, color = "🚨 이익 실현", "blue"
+            elif sell_score >= 1.5: signal, color = "📉 분할 매도", "skyblue"
+            elif trend == "하락" and buy_score >= 3: signal, color = "⚠️ 기술적 반등", "gray"
+        if signal != "관망":
+            reasons = buy_reasons if "매수" in signal or "반등" in signal else sell_reasons
+            if reasons: signal += f" ({', '.join(reasons)})"
+
+        if stop_loss_mode == "ATR 기반 (권장)":
+            val = close - (latest[atr_col] * kwargs.get('atr_multiplier', 2.0))
+            loss_info = f"{currency}{val:,.0f} (-{round((close-val)/close*100,1)}%)"
+        elif stop_loss_mode == "피봇 지지선 (S1) 기준":
+            loss_info = f"{currency}{s1:,.0f}" if s1 > 0 else "불가"
+        else:
+            pct = kwargs.get('stop_loss_pct', 3.0)
+            val = close * (1 - pct/100)
+            loss_info = f"{currency}{val:,.0f} (-{pct}%)"
+        return {"티커": ticker, "신호": signal, "현재가": close, "체결시간": rt_date_str, "손절가": loss_info,
+                "목표가": r1, "피보나치(0.618)": fib_618, "RSI": rsi, "추세": trend, "color": color}
+    except Exception as e: return {"티커": ticker, "신호": "오류", "오류 원인": str(e)}
+
+def inject_tick(df, tick):
+    # 티커 하나의 틱 주입 (새 날짜면 합성 봉 추가, 같은 날이면 마지막 종가 덮어쓰기) → (df, 체결시간 표시)
+    if tick is None: return df, "정규장 종가"
+    price, ts = tick
+    label = ts.strftime("%m-%d %H:%M")
+    if ts.date() > df.index[-1].date():
+        bar = pd.DataFrame({'open': price, 'high': price, 'low': price, 'close': price, 'volume': 0}, index=[pd.Timestamp(ts.date())])
+        return pd.concat([df, bar]), label + " (장전/시작)"
+    df = df.copy()
+    df.iloc[-1, df.columns.get_loc('close')] = price
+    return df, label + " (실시간)"
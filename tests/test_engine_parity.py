@@ -0,0 +1,112 @@
+# 패널 엔진 (analyze_panel) 이 예전 티커별 pandas_ta 경로 (tests/baseline.py) 와 결과 행이 완전히 같은지
+import numpy as np
+import pandas as pd
+import pytest
+
+import baseline
+from engine import (KOREA, analyze_dataframe, analyze_panel, compute_indicators, inject_ticks, latest_features, normalize_frame,
+                    panel_from_batch, panel_from_frames)
+from fakes import synthetic_bars
+
+END = "2025-06-02"
+STOP_LOSS = [("ATR 기반 (권장)", {'atr_multiplier': 2.3}), ("피봇 지지선 (S1) 기준", {}), ("고정 비율 (%)", {'stop_loss_pct': 4.5})]
+
+def same(a, b):
+    # NaN 끼리 같고, 부호까지 같아야 같다
+    if a.keys() != b.keys(): return False
+    for k in a:
+        x, y = a[k], b[k]
+        if isinstance(x, float) or isinstance(y, float):
+            if not (x == y or (x != x and y != y)): return False
+            if x == x and np.signbit(x) != np.signbit(y): return False
+        elif x != y: return False
+    return True
+
+def make_frames():
+    days = {"LONG": 520, "YEAR": 250, "MIN": 210, "SHORT": 199, "TINY": 30, "FEW": 4, "005930.KS": 300, "GAPS": 300, "ADJ": 300}
+    days.update({f"R{k:02d}": 260 + 7 * k for k in range(40)})   # 신호가 고루 나오도록 보통 종목 여럿
+    frames = {t: normalize_frame(synthetic_bars(t, n, END)) for t, n in days.items()}
+    frames["GAPS"].iloc[[20, 150, 298]] = np.nan                 # 중간 결측 봉
+    adj = frames["ADJ"]["close"] * 0.98
+    adj.iloc[[10, 200, -3]] = np.nan                               # 수정주가 결측 → 그 봉은 dropna 로 빠진다
+    frames["ADJ"]["adj close"] = adj
+    return frames
+
+def make_ticks(frames, mode):
+    # none: 틱 없음 / overwrite: 마지막 봉과 같은 날 / append: 다음 날 (합성 봉)
+    if mode == "none": return {}
+    ticks = {}
+    for k, (t, df) in enumerate(frames.items()):
+        day = df.index[-1] + pd.Timedelta(days=1 if mode == "append" else 0)
+        ts = (day + pd.Timedelta(hours=10, minutes=k)).tz_localize("America/New_York")
+        ticks[t] = (float(df["close"].dropna().iloc[-1]) * (1 + 0.013 * (-1) ** k), ts)
+    return ticks
+
+def reference(frames, ticks, stop_loss_mode, market, **kwargs):
+    out = []
+    for t, df in frames.items():
+        df, label = baseline.inject_tick(df.copy(), ticks.get(t))
+        out.append(baseline.analyze_dataframe(t, df, label, stop_loss_mode, market, **kwargs))
+    return out
+
+def assert_same(ref, got):
+    assert [r["티커"] for r in ref] == [g["티커"] for g in got]
+    bad = [(r, g) for r, g in zip(ref, got) if not same(r, g)]
+    assert not bad, bad[:3]
+
+@pytest.mark.parametrize("mode", ["none", "overwrite", "append"])
+@pytest.mark.parametrize("stop_loss", range(len(STOP_LOSS)))
+def test_panel_matches_baseline(mode, stop_loss):
+    frames = make_frames()
+    ticks = make_ticks(frames, mode)
+    stop_loss_mode, kwargs = STOP_LOSS[stop_loss]
+    market = KOREA if stop_loss % 2 else "US"
+    panel, labels = inject_ticks(panel_from_frames(frames), ticks)
+    got = analyze_panel(panel, labels, stop_loss_mode, market, **kwargs)
+    ref = reference(frames, ticks, stop_loss_mode, market, **kwargs)
+    assert_same(ref, got)
+    signals = {r["신호"] for r in got}
+    assert {"지표 실패", "데이터 부족"} <= signals
+
+@pytest.mark.parametrize("mode", ["none", "overwrite", "append"])
+def test_batch_matches_baseline(mode):
+    # yf.download(group_by='ticker') 형태: 공통 날짜축, 짧은 티커는 앞쪽이 NaN
+    frames = {t: df for t, df in make_frames().items() if t != "ADJ"}
+    batch = pd.concat({t: df.rename(columns=str.title) for t, df in frames.items()}, axis=1, sort=True)
+    tickers = list(frames)
+    padded = {t: normalize_frame(batch[t]) for t in tickers}
+    ticks = make_ticks(frames, mode)
+    panel, missing = panel_from_batch(batch, tickers)
+    assert not missing
+    panel, labels = inject_ticks(panel, ticks)
+    stop_loss_mode, kwargs = STOP_LOSS[0]
+    ref = reference(padded, ticks, stop_loss_mode, "US", **kwargs)
+    assert_same(ref, analyze_panel(panel, labels, stop_loss_mode, "US", **kwargs))
+
+def test_analyze_dataframe_matches_baseline():
+    for t, df in make_frames().items():
+        ref = baseline.analyze_dataframe(t, df.copy(), "정규장 종가", "ATR 기반 (권장)", "US")
+        assert same(ref, analyze_dataframe(t, df.copy(), "정규장 종가", "ATR 기반 (권장)", "US")), t
+
+@pytest.mark.parametrize("mode", ["none", "overwrite", "append"])
+def test_features_match_baseline(mode):
+    # 결과 행에 드러나지 않는 지표 (볼린저, 이평, ATR) 까지 마지막 봉 값이 비트 단위로 같은지
+    frames = make_frames()
+    ticks = make_ticks(frames, mode)
+    panel, _ = inject_ticks(panel_from_frames(frames), ticks)
+    with np.errstate(invalid='ignore'):
+        f = latest_features(panel, compute_indicators(panel))
+    columns = {'sma60': 'SMA_60', 'sma120': 'SMA_120', 'sma200': 'SMA_200', 'rsi': 'RSI_14', 'bbl': 'BBL_20_2.0', 'bbu': 'BBU_20_2.0',
+               'atr': 'ATRr_14'}
+    checked = 0
+    for i, (t, df) in enumerate(frames.items()):
+        df, _ = baseline.inject_tick(df.copy(), ticks.get(t))
+        df = baseline.add_indicators(df).dropna()
+        if not f['has_all'][i] or len(df) < 5: continue
+        latest = df.iloc[-1]
+        for key, col in columns.items(): assert f[key][i] == latest[col], (t, key)
+        assert (f['p'][i], f['s1'][i], f['r1'][i]) == baseline.get_pivot_points(df)[:2] + baseline.get_pivot_points(df)[3:4], t
+        assert (f['fib_618'][i], f['swing_high'][i]) == baseline.get_fibonacci_levels(df)[::2], t
+        assert f['max_vol_price'][i] == baseline.get_max_vol_price(df), t
+        checked += 1
+    assert checked >= 40
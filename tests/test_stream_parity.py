@@ -0,0 +1,56 @@
+# StreamState 가 틱마다 전체 재계산 (inject_ticks + analyze_states) 과 같은 상태를 내는지
+import numpy as np
+import pandas as pd
+
+from engine import analyze_states, compute_indicators, inject_ticks, latest_features, normalize_frame, panel_from_frames
+from fakes import synthetic_bars
+from incremental import StreamState
+
+END = "2025-06-02"
+EXACT = ('n_valid', 'has_all', 'close', 'rsi', 'atr', 'p', 's1', 'r1', 's2', 'r2', 'fib_618', 'fib_500', 'swing_high', 'swing_low',
+         'max_vol_price')
+
+def make_panel():
+    frames = {f"S{k:02d}": normalize_frame(synthetic_bars(f"S{k:02d}", 300 + 5 * k, END)) for k in range(60)}
+    for k in range(20):
+        # 저가주: 고가-저가 폭이 1 근처라 EPS 가 붙느냐에 따라 ATR 끝자리가 달라진다
+        penny = normalize_frame(synthetic_bars(f"P{k:02d}", 300, END))
+        penny[["open", "high", "low", "close"]] *= 2.0 / penny["close"].iloc[0]
+        frames[f"P{k:02d}"] = penny
+    frames["KR.KS"] = normalize_frame(synthetic_bars("005930.KS", 300, END))
+    frames["SHORT"] = normalize_frame(synthetic_bars("SHORT", 150, END))          # 추적 불가 → 패널 재계산
+    extra = normalize_frame(synthetic_bars("EXTRA", 300, END))
+    extra["adj close"] = extra["close"]                                              # 추가 컬럼 → 패널 재계산
+    frames["EXTRA"] = extra
+    return panel_from_frames(frames)
+
+def check(stream, panel):
+    with np.errstate(invalid='ignore'):
+        f = latest_features(panel, compute_indicators(panel))
+    g, ok = stream.features(), stream.ok
+    for k in f:
+        if k in EXACT: assert np.array_equal(f[k][ok], g[k][ok], equal_nan=k not in ('n_valid', 'has_all')), k
+        else: np.testing.assert_allclose(g[k][ok], f[k][ok], rtol=1e-12, err_msg=k)   # 이동 합 (SMA / 볼린저)
+    assert stream.states() == analyze_states(panel)
+
+def test_stream_matches_full_recompute():
+    panel = make_panel()
+    stream = StreamState(panel)
+    assert stream.ok.sum() == 81 and stream.fallback == ["SHORT", "EXTRA"]
+    check(stream, panel)
+
+    rng = np.random.default_rng(0)
+    last = panel['values'][:, -1, 3]
+    day = pd.Timestamp(str(panel['dates'][0, -1])).tz_localize("America/New_York")
+    def move(ts, every=1, scale=0.02):
+        return {t: (float(last[i] * (1 + rng.normal(0, scale))), ts) for i, t in enumerate(panel['tickers']) if i % every == 0}
+
+    steps = [move(day + pd.Timedelta(hours=10), every=2),                 # 같은 날 종가 교체
+             move(day + pd.Timedelta(days=1, hours=9)),                  # 다음 날 합성 봉 (고가=저가 → ATR EPS)
+             move(day + pd.Timedelta(days=1, hours=11), every=3)]        # 합성 봉 종가 교체
+    steps += [move(day + pd.Timedelta(days=d, hours=9), scale=0.03) for d in range(2, 25)]
+    for ticks in steps:
+        panel, _ = inject_ticks(panel, ticks)
+        changed = stream.update(ticks)
+        assert set(changed) <= set(ticks)
+        check(stream, panel)
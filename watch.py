@@ -0,0 +1,58 @@
+# 실시간 감시 (자동 갱신)
+# 일봉 패널은 한 번만 적재해 스트리밍 상태로 들고 있고, 주기마다 마지막 체결가만 받아
+# 가격이 바뀐 티커만 다시 채점한다. 신호가 바뀐 티커는 (티커, 이전 신호, 새 신호) 로 알려준다.
+import time
+
+from engine import inject_ticks
+from incremental import StreamState
+from metrics import record, stage
+from realtime import fetch_snapshots, as_ticks
+from scan import load_panel, resolve_names
+from store import BarStore
+
+def signal_name(signal):
+    # "💎 인생 매수 (볼린저하단, 피벗S1)" → "💎 인생 매수" (근거 목록만 바뀐 것은 전환으로 보지 않는다)
+    return signal.split(" (")[0]
+
+class Watcher:
+    def __init__(self, tickers, market, store=None, names=None, krx=None, progress=None, snapshots=fetch_snapshots, rules=None):
+        self.market = market
+        self.snapshots = snapshots
+        notify = progress or (lambda *a: None)
+        with stage('daily'): panel, self.order, self.errors = load_panel(tickers, store or BarStore(), notify)
+        with stage('realtime'): ticks = as_ticks(snapshots(self.order, on_done=lambda d, n, t: notify('realtime', d, n, t)))
+        notify('analyze', 0, len(self.order), None)
+        with stage('analyze'):
+            panel, labels = inject_ticks(panel, ticks)
+            self.stream = StreamState(panel, labels, rules)
+            self.states = dict(zip(self.order, self.stream.states(self.order)))
+        if names is not None:
+            with stage('names'): resolve_names(names, krx, self.order, notify)
+        self.polled = time.time()
+        self.polls, self.rescored = 0, 0
+
+    def due(self, interval):
+        return time.time() - self.polled >= interval
+
+    def poll(self):
+        # → (가격이 바뀐 티커, [(티커, 이전 신호, 새 신호)]). 나머지 티커는 네트워크 외에 아무 일도 하지 않는다
+        with stage('poll'): ticks = as_ticks(self.snapshots(self.order))
+        self.polled = time.time()
+        with stage('rescore'):
+            changed = self.stream.update(ticks)
+            # 가격이 그대로인 티커는 재채점하지 않는다 (이전 상태 재사용)
+            record('cache_hit', len(set(self.order)) - len(changed))
+            record('cache_miss', len(changed))
+            transitions = []
+            for ticker, state in zip(changed, self.stream.states(changed)):
+                old = self.states.get(ticker)
+                if old and signal_name(old["신호"]) != signal_name(state["신호"]):
+                    transitions.append((ticker, signal_name(old["신호"]), signal_name(state["신호"])))
+                self.states[ticker] = state
+        self.polls += 1
+        self.rescored += len(changed)
+        return changed, transitions
+
+    def snapshot(self):
+        # scan_states 와 같은 (states, rt_labels, errors)
+        return [self.states[t] for t in self.order], dict(self.stream.labels), list(self.errors)
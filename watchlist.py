@@ -0,0 +1,236 @@
+# 관심종목 저장소 (로컬 우선 + 원격 JSONBin 지연 동기화)
+# 편집은 로컬 JSON 파일에 바로 쓰고 (write-through), 원격 bin 에는 마지막 편집 뒤 debounce 초 동안 조용하면
+# 전체 목록을 한 번만 올린다 (연속 편집이 이어져도 max_delay 초 안에는 올린다). 원격 실패는 로컬에 "미동기화" 로 남겨
+# 다음 편집이나 flush() 때 다시 보낸다. 이름 붙은 목록 여러 개를 bin 하나에 {'watchlists': {이름: [티커]}} 로 담는다.
+# 미동기화 편집이 없으면 시작할 때와 그 뒤 ttl 초마다 원격을 다시 읽고, 올릴 때는 원격을 먼저 읽어 마지막 동기화 시점(base)
+# 기준 3-way 병합을 한다 - 다른 클라이언트의 편집을 덮어쓰지 않는다.
+import atexit
+import json
+import os
+import threading
+import time
+
+import requests
+
+from metrics import count_response, record
+from store import DATA_DIR
+
+DEFAULT_LIST = "기본"
+TIMEOUT = 5          # 원격 요청 제한 시간 (초)
+DEBOUNCE = 2.0       # 마지막 편집 뒤 이만큼 조용하면 올린다
+MAX_DELAY = 10.0     # 편집이 계속 이어져도 첫 미동기화 편집 뒤 이 시간 안에는 올린다
+RETRY_AFTER = 60.0   # 원격 저장이 실패하면 이만큼 뒤에 다시 올린다
+TTL = 300.0          # 미동기화 편집이 없을 때 원격을 다시 읽는 주기
+
+class JsonBinRemote:
+    """JSONBin v3 bin 하나. load() 는 실패하면 None, save() 는 성공 여부."""
+
+    def __init__(self, bin_id, api_key, base_url="https://api.jsonbin.io/v3/b", timeout=TIMEOUT, session=None):
+        self.url = f"{base_url.rstrip('/')}/{bin_id}"
+        self.timeout = timeout
+        self.session = session or requests.Session()
+        self.session.headers.update({'Content-Type': 'application/json', 'X-Master-Key': api_key})
+        self.session.hooks['response'].append(count_response)
+
+    def load(self):
+        try:
+            res = self.session.get(f"{self.url}/latest", timeout=self.timeout)
+            res.raise_for_status()
+            data = res.json().get('record') or {}
+        except (requests.RequestException, ValueError): return None
+        # 예전 형식 {'watchlist': [...]} 은 기본 목록 하나로 읽는다
+        if isinstance(data.get('watchlists'), dict): return {k: list(v) for k, v in data['watchlists'].items()}
+        return {DEFAULT_LIST: list(data.get('watchlist', []))}
+
+    def save(self, lists):
+        # 예전 형식만 읽는 클라이언트를 위해 기본 목록을 'watchlist' 에도 같이 쓴다
+        body = {'watchlists': lists, 'watchlist': lists.get(DEFAULT_LIST, [])}
+        try:
+            res = self.session.put(self.url, json=body, timeout=self.timeout)
+            res.raise_for_status()
+            return True
+        except requests.RequestException: return False
+
+def merge_lists(base, local, remote):
+    # 3-way 병합: base(마지막 동기화) 이후 로컬에서 더하고 뺀 것을 원격 위에 다시 적용한다. base 를 모르면 합집합
+    out = {}
+    base = base if base is not None else {}
+    for name in dict.fromkeys([*remote, *local]):
+        b, l, r = base.get(name), local.get(name), remote.get(name)
+        if l is None:
+            # 로컬에서 지운 목록은 원격에서 그사이 바뀌지 않았을 때만 지운다
+            if r is not None and (b is None or r != b): out[name] = list(r)
+            continue
+        if r is None:
+            # 원격에서 지운 목록은 로컬에서 그사이 바뀌지 않았을 때만 지운다
+            if b is None or l != b: out[name] = list(l)
+            continue
+        added = [t for t in l if t not in (b or [])]
+        removed = set(b or []) - set(l)
+        out[name] = [t for t in r if t not in removed] + [t for t in added if t not in r]
+    return out or {DEFAULT_LIST: []}
+
+class WatchlistStore:
+    def __init__(self, path=None, remote=None, debounce=DEBOUNCE, max_delay=MAX_DELAY, ttl=TTL):
+        self.path = path or os.path.join(DATA_DIR, "watchlists.json")
+        self.remote = remote
+        self.debounce, self.max_delay, self.ttl = debounce, max_delay, ttl
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        self._timer = None
+        self._pending_since = None
+        self.syncs = 0            # 원격에 올린 횟수
+        self.last_error = None    # 마지막 동기화 실패 시각
+        self._pulled = None       # 마지막으로 원격을 읽은 시각 (monotonic)
+        disk = self._read()
+        self._lists = disk.get('lists') or {DEFAULT_LIST: []}
+        self._base = disk.get('base')   # 마지막으로 원격과 맞췄던 목록 (병합 기준)
+        self._version = 1 if disk.get('dirty') else 0
+        self._synced = 0
+        if remote is not None:
+            # 로컬에 못 올린 편집이 남아 있으면 곧 (병합해서) 올리고, 아니면 원격을 받아 온다
+            if self.dirty: self._schedule()
+            else: self.pull()
+        atexit.register(self.close)
+
+    # --- 로컬 파일 ---
+    def _read(self):
+        try:
+            with open(self.path, encoding='utf-8') as f: return json.load(f)
+        except (OSError, ValueError): return {}
+
+    def _write(self):
+        # 호출 측이 _lock 을 잡고 있다
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({'lists': self._lists, 'dirty': self._version != self._synced, 'base': self._base, 'ts': time.time()}, f,
+                      ensure_ascii=False)
+        os.replace(tmp, self.path)
+
+    # --- 읽기 (미동기화 편집이 없으면 ttl 마다 원격을 다시 읽는다) ---
+    def _refresh(self):
+        if self.remote is None or self.dirty: return
+        if self._pulled is not None and time.monotonic() - self._pulled < self.ttl: return
+        self.pull()
+
+    def names(self):
+        self._refresh()
+        with self._lock: return list(self._lists)
+
+    def get(self, name=DEFAULT_LIST):
+        self._refresh()
+        with self._lock: return list(self._lists.get(name, []))
+
+    def __contains__(self, name):
+        return name in self._lists
+
+    @property
+    def dirty(self):
+        return self._version != self._synced
+
+    # --- 편집 (로컬에 바로 쓰고 원격 동기화는 예약만) ---
+    def _edit(self, fn):
+        with self._lock:
+            if fn(self._lists) is False: return False
+            self._version += 1
+            self._write()
+        self._schedule()
+        return True
+
+    def add(self, name, tickers):
+        # 티커 여러 개를 한 번의 편집으로 (이미 있는 티커는 건너뛴다)
+        tickers = [tickers] if isinstance(tickers, str) else list(tickers)
+        def fn(lists):
+            cur = lists.setdefault(name, [])
+            new = [t for t in dict.fromkeys(tickers) if t and t not in cur]
+            if not new: return False
+            cur += new
+        return self._edit(fn)
+
+    def remove(self, name, tickers):
+        drop = {tickers} if isinstance(tickers, str) else set(tickers)
+        def fn(lists):
+            if not drop & set(lists.get(name, [])): return False
+            lists[name] = [t for t in lists[name] if t not in drop]
+        return self._edit(fn)
+
+    def replace(self, name, tickers):
+        tickers = list(dict.fromkeys(tickers))
+        def fn(lists):
+            if lists.get(name) == tickers: return False
+            lists[name] = tickers
+        return self._edit(fn)
+
+    def create(self, name):
+        def fn(lists):
+            if not name or name in lists: return False
+            lists[name] = []
+        return self._edit(fn)
+
+    def delete(self, name):
+        def fn(lists):
+            if name not in lists: return False
+            del lists[name]
+        return self._edit(fn)
+
+    # --- 원격 동기화 ---
+    def _schedule(self, delay=None):
+        if self.remote is None: return
+        with self._lock:
+            now = time.monotonic()
+            if self._pending_since is None: self._pending_since = now
+            if delay is None: delay = max(0.0, min(self.debounce, self._pending_since + self.max_delay - now))
+            if self._timer is not None: self._timer.cancel()
+            self._timer = threading.Timer(delay, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def flush(self):
+        # 미동기화 편집을 지금 올린다 → 동기화 상태 여부. 원격을 먼저 읽어 병합한 결과를 올리고 로컬도 그것으로 맞춘다.
+        # 원격을 읽지 못하면 덮어쓰지 않고 실패로 다룬다. 올리는 동안 들어온 편집은 다음 예약으로 넘어간다
+        if self.remote is None: return True
+        with self._sync_lock:
+            with self._lock:
+                if self._timer is not None: self._timer.cancel(); self._timer = None
+                if not self.dirty: self._pending_since = None; return True
+                version, base = self._version, self._base
+                lists = {k: list(v) for k, v in self._lists.items()}
+            remote = self.remote.load()
+            merged = merge_lists(base, lists, remote) if remote is not None else None
+            ok = merged is not None and self.remote.save(merged)
+            with self._lock:
+                if ok:
+                    self.syncs += 1
+                    self._synced = version
+                    # 올리는 동안 들어온 로컬 편집은 병합 결과 위에 다시 얹는다
+                    self._lists = merge_lists(lists, self._lists, merged)
+                    self._base = merged
+                    self._pulled = time.monotonic()
+                    self._pending_since = None if not self.dirty else time.monotonic()
+                    self._write()
+                else:
+                    record('retry')
+                    self.last_error = time.time()
+                    self._pending_since = None
+            if not ok: self._schedule(RETRY_AFTER)
+            return ok and not self.dirty
+
+    def pull(self):
+        # 원격 목록을 받아 로컬을 덮어쓴다. 아직 못 올린 로컬 편집이 있으면 건드리지 않는다 (올릴 때 병합한다) → 받아 왔는지
+        if self.remote is None: return False
+        self._pulled = time.monotonic()   # 실패해도 ttl 동안은 다시 묻지 않는다 (그동안 로컬 사본으로 동작)
+        lists = self.remote.load()
+        if lists is None:
+            record('fallback')
+            return False
+        with self._lock:
+            if self.dirty: return False
+            self._lists = lists or {DEFAULT_LIST: []}
+            self._base = {k: list(v) for k, v in self._lists.items()}
+            self._write()
+        return True
+
+    def close(self):
+        if self._timer is not None: self._timer.cancel()
+        if self.dirty: self.flush()